@@ -10,8 +10,9 @@ import shutil
 import sys
 import traceback
 
-from .py.csvreader import Soze_CSVReader, Soze_CSVReaderXCheckpoint, Soze_CSVReaderXLora
+from .py.csvreader import Soze_CSVReader, Soze_CSVReaderBatch, Soze_CSVReaderXCheckpoint, Soze_CSVReaderXLora
 from .py.csvwriter import Soze_CSVWriter
+from .py.recordlog import Soze_RecordLogWriter, Soze_RecordLogReader, Soze_RecordLogConverter
 from .py.xy import Soze_UnzippedProductAny
 #from .py.promptxlora import Soze_PromptXLora
 from .py.lorafileloader import Soze_LoraFilePathLoader
@@ -96,7 +97,11 @@ from .py.images import (
     Soze_LoadImageFromFilepath,
     Soze_MultiImageBatch,
     Soze_ImageSizeWithMaximum,
-    Soze_SaveImageWithAbsoluteFilename
+    Soze_SaveImageWithAbsoluteFilename,
+    Soze_ImageToFloat,
+    Soze_BenchmarkImageEncoders,
+    Soze_SaveImageCache,
+    Soze_LoadImageCache,
 )
 # from .py.samaudio import Soze_SAMAudioTextPrompt
 
@@ -122,8 +127,12 @@ NODE_CLASS_MAPPINGS = { "Output Filename": Soze_OutputFilename,
                         "Image Batch Process Switch": Soze_BatchProcessSwitch,
                         "Load Image From URL": Soze_LoadImageFromUrl,
                         "CSV Reader": Soze_CSVReader,
+                        "CSV Reader Batch": Soze_CSVReaderBatch,
                         "CSV Reader X Checkpoint": Soze_CSVReaderXCheckpoint,
                         "CSV Writer": Soze_CSVWriter,
+                        "Record Log Writer": Soze_RecordLogWriter,
+                        "Record Log Reader": Soze_RecordLogReader,
+                        "Record Log Converter": Soze_RecordLogConverter,
                         "Special Character Replacer": Soze_SpecialCharacterReplacer,
                         "Multiline Concatenate Strings": Soze_MultilineConcatenateStrings,
                         "Range(Step) - Int": Soze_IntRangeNode,
@@ -205,6 +214,10 @@ NODE_CLASS_MAPPINGS = { "Output Filename": Soze_OutputFilename,
                         #Images
                         "Soze Image Size With Maximum": Soze_ImageSizeWithMaximum,
                         "Save Image With Absolute Filename": Soze_SaveImageWithAbsoluteFilename,
+                        "Image To Float": Soze_ImageToFloat,
+                        "Benchmark Image Encoders": Soze_BenchmarkImageEncoders,
+                        "Save Image Cache": Soze_SaveImageCache,
+                        "Load Image Cache": Soze_LoadImageCache,
                         
                         #Video
                         "Append To Video": Soze_AppendToVideo,
@@ -225,7 +238,11 @@ NODE_DISPLAY_NAME_MAPPINGS = { "Output Filename": "Output Filename (Soze)",
                                 "Image Batch Process Switch": "Image Batch Process Switch (Soze)",
                                 "Load Image From URL": "Load Image From URL (Soze)",
                                 "CSV Reader": "CSV Reader (Soze)",
+                                "CSV Reader Batch": "CSV Reader Batch (Soze)",
                                 "CSV Writer": "CSV Writer (Soze)",
+                                "Record Log Writer": "Record Log Writer (Soze)",
+                                "Record Log Reader": "Record Log Reader (Soze)",
+                                "Record Log Converter": "Record Log Converter (Soze)",
                                 "Special Character Replacer": "Special Character Replacer (Soze)",                               
                                 "Multiline Concatenate Strings": "Multiline Concatenate (Soze)",
                                 "Range(Step) - Int": "Int Step Range (Soze)",
@@ -309,6 +326,10 @@ NODE_DISPLAY_NAME_MAPPINGS = { "Output Filename": "Output Filename (Soze)",
                                 #Images
                                 "Soze Image Size With Maximum": "Soze Image Size With Maximum (Soze)",
                                 "Save Image With Absolute Filename": "Save Image With Absolute Filename (Soze)",
+                                "Image To Float": "Image To Float (Soze)",
+                                "Benchmark Image Encoders": "Benchmark Image Encoders (Soze)",
+                                "Save Image Cache": "Save Image Cache (Soze)",
+                                "Load Image Cache": "Load Image Cache (Soze)",
                                 
                                 #Video
                                 "Append To Video": "Append To Video (Soze)",
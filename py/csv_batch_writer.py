@@ -0,0 +1,180 @@
+#Per-path appenders for the CSV Writer node.
+#Rows are buffered in memory and appended in one open/write/close, flushed when enough rows
+#are waiting, when a row has waited its flush_seconds, and before the process exits. Unbuffered
+#rows are written immediately along with anything buffered before them. Every append holds an
+#advisory lock on the file so rows from concurrent processes never interleave.
+
+import atexit
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+FLUSH_ROWS = 64
+FLUSH_BYTES = 1024 * 1024
+FLUSH_SECONDS = 5.0
+FLUSH_CHECK_INTERVAL = 0.5
+WRITE_RETRIES = 3
+RETRY_DELAY = 0.5
+
+
+def lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        # Windows locks byte ranges, every writer locks the first byte of the file
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CSVBatchWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lines: List[str] = []
+        self._bytes = 0
+        # When the most urgent buffered row has to be written, each row brings its own flush_seconds
+        self._deadline: Optional[float] = None
+        self._lock = threading.Lock()
+        # Serializes flushes of this path within the process, the file lock covers other processes
+        self._write_lock = threading.Lock()
+
+    def append(self, line: str, flush_rows: int = FLUSH_ROWS, flush_seconds: float = FLUSH_SECONDS):
+        """Buffers line. A failed flush keeps the rows queued for the next attempt instead of raising."""
+        with self._lock:
+            self._lines.append(line)
+            self._bytes += len(line.encode('utf-8'))
+            deadline = time.monotonic() + flush_seconds
+            if self._deadline is None or deadline < self._deadline:
+                self._deadline = deadline
+            due = len(self._lines) >= flush_rows or self._bytes >= FLUSH_BYTES
+        if due:
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error flushing CSV rows, they will be retried: {e}")
+
+    def write(self, line: str):
+        """
+        Appends line now, after any buffered rows. Raises OSError when it cannot be written, in
+        which case line is dropped so the caller's failure is final, the buffered rows stay queued.
+        """
+        with self._write_lock:
+            lines = self._take()
+            try:
+                self._write(''.join(lines) + line)
+            except OSError:
+                self._requeue(lines)
+                raise
+
+    def flush_if_due(self):
+        with self._lock:
+            due = self._deadline is not None and time.monotonic() >= self._deadline
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows, raising OSError after keeping them queued when that fails."""
+        with self._write_lock:
+            lines = self._take()
+            if not lines:
+                return
+            try:
+                self._write(''.join(lines))
+            except OSError:
+                self._requeue(lines)
+                raise
+
+    def _take(self) -> List[str]:
+        with self._lock:
+            lines = self._lines
+            self._lines = []
+            self._bytes = 0
+            self._deadline = None
+        return lines
+
+    def _requeue(self, lines: List[str]):
+        # Ahead of anything buffered since, retried by the next flush
+        if not lines:
+            return
+        with self._lock:
+            self._lines[:0] = lines
+            self._bytes += sum(len(line.encode('utf-8')) for line in lines)
+            if self._deadline is None:
+                self._deadline = time.monotonic() + RETRY_DELAY
+
+    def _write(self, data: str):
+        for attempt in range(WRITE_RETRIES):
+            try:
+                with open(self.path, 'a', newline='', encoding='utf-8') as csvfile:
+                    lock_file(csvfile)
+                    try:
+                        csvfile.write(data)
+                        csvfile.flush()
+                    finally:
+                        unlock_file(csvfile)
+                return
+            except OSError as e:
+                if attempt < WRITE_RETRIES - 1:
+                    time.sleep(RETRY_DELAY * (2 ** attempt))
+                else:
+                    raise OSError(f"Could not write to CSV file: {self.path}") from e
+
+
+_writers: Dict[str, CSVBatchWriter] = {}
+_writers_lock = threading.Lock()
+_flush_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _flush_loop():
+    while not _stop.wait(FLUSH_CHECK_INTERVAL):
+        with _writers_lock:
+            writers = list(_writers.values())
+        for writer in writers:
+            try:
+                writer.flush_if_due()
+            except OSError as e:
+                print(f"Error flushing CSV rows: {e}")
+
+
+def get_csv_writer(path: str) -> CSVBatchWriter:
+    global _flush_thread
+    path = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = CSVBatchWriter(path)
+        if _flush_thread is None:
+            _flush_thread = threading.Thread(target=_flush_loop, name="soze_csv_flush", daemon=True)
+            _flush_thread.start()
+    return writer
+
+
+def flush_csv_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        try:
+            writer.flush()
+        except OSError as e:
+            print(f"Error flushing CSV rows: {e}")
+
+
+atexit.register(flush_csv_writers)
@@ -0,0 +1,289 @@
+#Indexed access to the rows of CSV files for the CSV reader nodes.
+#A file is scanned once to record the byte offset where each row starts, so reading row N
+#is one seek and read of its bytes and a single row parse, and the file itself is never
+#loaded into memory. No handle is kept open between reads, so the CSV can still be edited. The offsets are persisted next to the CSV (<file>.rowidx) so the scan
+#survives restarts, and when the file has only been appended to, just the new bytes are scanned.
+
+import codecs
+import csv
+import io
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+MAX_CACHED_FILES = 16
+MAX_CACHED_ROWS = 1024
+INDEX_EXTENSION = ".rowidx"
+
+_QUOTE = ord('"')
+_COMMA = ord(',')
+
+# Field states of the csv module's default dialect that matter for finding row ends
+_START_FIELD, _IN_FIELD, _IN_QUOTED, _QUOTE_IN_QUOTED = range(4)
+
+# magic, scanned bytes, file size, file mtime_ns, crc32 of the bytes before the scan end, in_quotes, utf8, offset count
+_INDEX_MAGIC = b"SOZECSV1"
+_INDEX_HEADER = struct.Struct("<8sQQqI??Q")
+# Bytes before the scan end that must be unchanged for an append to be indexed incrementally
+_TAIL_CHECK_BYTES = 4096
+
+
+def _scan_line(line: bytes, in_quotes: bool) -> bool:
+    """Returns whether a quoted field is still open at the end of line, following csv's quoting rules."""
+    if _QUOTE not in line:
+        return in_quotes
+    state = _IN_QUOTED if in_quotes else _START_FIELD
+    for c in line:
+        if state == _START_FIELD:
+            if c == _QUOTE:
+                state = _IN_QUOTED
+            elif c != _COMMA:
+                state = _IN_FIELD
+        elif state == _IN_FIELD:
+            if c == _COMMA:
+                state = _START_FIELD
+        elif state == _IN_QUOTED:
+            if c == _QUOTE:
+                state = _QUOTE_IN_QUOTED
+        else:
+            if c == _QUOTE:
+                state = _IN_QUOTED
+            elif c == _COMMA:
+                state = _START_FIELD
+            else:
+                state = _IN_FIELD
+    return state == _IN_QUOTED
+
+
+def parse_row(text: str) -> List[str]:
+    rows = list(csv.reader(io.StringIO(text, newline='')))
+    return rows[0] if rows else []
+
+
+class _ScanState:
+    """
+    Progress of a row scan. Only complete lines are scanned, so a partial last line that is
+    still being written is picked up by the next incremental scan.
+    """
+
+    def __init__(self, offsets: array, scan_offset: int, in_quotes: bool, utf8: bool, tail_crc: int = 0):
+        # Start offsets of the rows found before scan_offset
+        self.offsets = offsets
+        self.scan_offset = scan_offset
+        self.in_quotes = in_quotes
+        self.utf8 = utf8
+        # crc32 of the bytes just before scan_offset, to recognise a file that was only appended to
+        self.tail_crc = tail_crc
+
+    @classmethod
+    def empty(cls, start: int) -> "_ScanState":
+        return cls(array('Q'), start, False, True)
+
+    def copy(self) -> "_ScanState":
+        return _ScanState(array('Q', self.offsets), self.scan_offset, self.in_quotes, self.utf8, self.tail_crc)
+
+    def scan(self, f):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        f.seek(self.scan_offset)
+        offset = self.scan_offset
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            if self.utf8:
+                try:
+                    decoder.decode(line)
+                except UnicodeDecodeError:
+                    self.utf8 = False
+            if not self.in_quotes:
+                self.offsets.append(offset)
+            self.in_quotes = _scan_line(line, self.in_quotes)
+            offset += len(line)
+        self.scan_offset = offset
+        self.tail_crc = _tail_crc(f, offset)
+
+
+def _tail_crc(f, end: int) -> int:
+    start = max(0, end - _TAIL_CHECK_BYTES)
+    f.seek(start)
+    return zlib.crc32(f.read(end - start))
+
+
+def _index_path(path: str) -> str:
+    return path + INDEX_EXTENSION
+
+
+def _save_index(path: str, state: _ScanState, stamp: Tuple[int, int]):
+    offsets = state.offsets
+    if sys.byteorder != 'little':
+        offsets = array('Q', offsets)
+        offsets.byteswap()
+    index_path = _index_path(path)
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, state.scan_offset, stamp[0], stamp[1], state.tail_crc, state.in_quotes, state.utf8, len(offsets)))
+            offsets.tofile(f)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        # The folder may be read only, the index then only lives in memory
+        print(f"Could not save CSV row index {index_path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _load_index(path: str) -> Optional[Tuple[_ScanState, Tuple[int, int]]]:
+    try:
+        with open(_index_path(path), 'rb') as f:
+            header = f.read(_INDEX_HEADER.size)
+            if len(header) != _INDEX_HEADER.size:
+                return None
+            magic, scan_offset, size, mtime_ns, tail_crc, in_quotes, utf8, count = _INDEX_HEADER.unpack(header)
+            if magic != _INDEX_MAGIC:
+                return None
+            offsets = array('Q')
+            offsets.fromfile(f, count)
+    except (OSError, EOFError, struct.error):
+        return None
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return (_ScanState(offsets, scan_offset, in_quotes, utf8, tail_crc), (size, mtime_ns))
+
+
+class CSVIndex:
+    """Row offsets of a CSV file, plus a small LRU of parsed rows."""
+
+    def __init__(self, path: str, stamp: Tuple[int, int], state: _ScanState):
+        self.path = path
+        self.stamp = stamp
+        self.state = state
+        size = stamp[0]
+
+        # A last line without a newline is a row of its own unless it continues a quoted field
+        self._starts = state.offsets
+        self._tail_start = state.scan_offset if size > state.scan_offset and not state.in_quotes else None
+        self._size = size
+
+        # Same fallback as reading the whole file: utf-8 first, windows-1252 if that fails
+        utf8 = state.utf8
+        if utf8 and size > state.scan_offset:
+            with open(path, 'rb') as f:
+                f.seek(state.scan_offset)
+                try:
+                    f.read(size - state.scan_offset).decode('utf-8')
+                except UnicodeDecodeError:
+                    utf8 = False
+        self.encoding = 'utf-8' if utf8 else 'windows-1252'
+
+        self._rows: "OrderedDict[int, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def row_count(self) -> int:
+        return len(self._starts) + (1 if self._tail_start is not None else 0)
+
+    def _row_start(self, index: int) -> int:
+        if index < len(self._starts):
+            return self._starts[index]
+        return self._tail_start
+
+    def get_row(self, index: int) -> List[str]:
+        if index < 0 or index >= self.row_count:
+            raise IndexError(f"Row {index} is out of range for {self.path} ({self.row_count} rows)")
+        return self.get_rows(index, 1)[0]
+
+    def get_rows(self, start: int, count: int) -> List[List[str]]:
+        if start < 0:
+            raise IndexError(f"Row {start} is out of range for {self.path} ({self.row_count} rows)")
+        indexes = range(start, min(start + count, self.row_count))
+        rows = {}
+        with self._lock:
+            for index in indexes:
+                row = self._rows.get(index)
+                if row is not None:
+                    self._rows.move_to_end(index)
+                    rows[index] = row
+
+        missing = [index for index in indexes if index not in rows]
+        if missing:
+            # The file is opened for this read only, an open handle or mapping would keep it from being overwritten on Windows
+            with open(self.path, 'rb') as f:
+                for index in missing:
+                    row_start = self._row_start(index)
+                    row_end = self._row_start(index + 1) if index + 1 < self.row_count else self._size
+                    f.seek(row_start)
+                    rows[index] = parse_row(f.read(row_end - row_start).decode(self.encoding))
+            with self._lock:
+                for index in missing:
+                    self._rows[index] = rows[index]
+                while len(self._rows) > MAX_CACHED_ROWS:
+                    self._rows.popitem(last=False)
+        return [rows[index] for index in indexes]
+
+
+_indexes: "OrderedDict[str, CSVIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def _build_index(path: str, stamp: Tuple[int, int], previous: Optional[CSVIndex]) -> CSVIndex:
+    # Start from the in-memory index, or the one persisted next to the file, when it still describes
+    # the start of the file. An unchanged file needs no scan and an appended one only a partial scan.
+    if previous is not None:
+        base = (previous.state, previous.stamp)
+    else:
+        base = _load_index(path)
+
+    with open(path, 'rb') as f:
+        state = None
+        if base is not None:
+            base_state, base_stamp = base
+            if base_stamp == stamp:
+                return CSVIndex(path, stamp, base_state)
+            if stamp[0] >= base_state.scan_offset and _tail_crc(f, base_state.scan_offset) == base_state.tail_crc:
+                state = base_state.copy()
+
+        if state is None:
+            start = len(codecs.BOM_UTF8) if f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8 else 0
+            state = _ScanState.empty(start)
+        state.scan(f)
+
+    _save_index(path, state, stamp)
+    return CSVIndex(path, stamp, state)
+
+
+def get_csv_index(path: str) -> CSVIndex:
+    """Returns the row index of the CSV file at path, building or extending it when the file changes."""
+    stamp = _stamp(path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is not None and index.stamp == stamp:
+            _indexes.move_to_end(path)
+            return index
+
+    index = _build_index(path, stamp, index)
+
+    with _indexes_lock:
+        _indexes[path] = index
+        _indexes.move_to_end(path)
+        while len(_indexes) > MAX_CACHED_FILES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear_csv_indexes(path: Optional[str] = None):
+    with _indexes_lock:
+        if path is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(path, None)
@@ -1,11 +1,89 @@
-import time
 import csv
 import os
-import random
 import folder_paths
-import comfy.utils
 
-from comfy import model_management
+from .csv_index import get_csv_index
+from .iteration_plan import ITERATION_ORDERS, format_eta, get_iteration_plan
+
+
+def resolve_csv_path(csv_filename_path):
+    csv_path = os.path.join(os.path.dirname(__file__), "csv_files", csv_filename_path.strip())
+    return os.path.normpath(csv_path)  # Normalize path separators
+
+
+def csv_file_stamp(csv_filename_path):
+    # Rows are served from a cached index, so an unchanged file and index can reuse the previous result
+    try:
+        st = os.stat(resolve_csv_path(csv_filename_path))
+    except OSError:
+        return float("NaN")
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def load_csv_rows(csv_filename_path, csv_text=""):
+    """Returns (row_count, get_row) for the inline csv_text, or for the file through its cached row index."""
+    if csv_text.strip() != '':
+        csv_data = csv_text.splitlines()
+        csv_reader = csv.reader(csv_data)
+        rows = list(csv_reader)
+        return len(rows), rows.__getitem__
+    csv_path = resolve_csv_path(csv_filename_path)
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    # Rows are read by seeking to their offset in a cached index of the file
+    csv_index = get_csv_index(csv_path)
+    return csv_index.row_count, csv_index.get_row
+
+
+def row_outputs(row):
+    """Splits a row into the 10 column outputs and the entire line, with quotes stripped from each value."""
+    stripped_row = [value.strip('"') for value in row]
+    output = stripped_row[:10] + [""] * (10 - len(stripped_row))
+    entire_line = ",".join(stripped_row)
+    return output, entire_line
+
+
+def read_sweep_step(csv_filename_path, index, folder_name, start_name, model_count, order, model_label, plural_label):
+    """Shared body of the X Checkpoint / X Lora readers: the CSV row and model for index in the cached sweep plan."""
+    if csv_filename_path.strip() == "":
+        raise ValueError("CSV filename path cannot be empty.")
+
+    csv_path = resolve_csv_path(csv_filename_path)
+
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    try:
+        # Rows are read by seeking to their offset in a cached index of the file
+        csv_index = get_csv_index(csv_path)
+    except FileNotFoundError:
+        raise  # Re-raise the FileNotFoundError
+    except Exception as e:
+        print(f"Error reading CSV: {str(e)}")
+        raise ValueError(f"Error reading CSV file: {str(e)}")
+
+    row_count = csv_index.row_count
+    if row_count == 0:
+        raise ValueError(f"CSV file is empty: {csv_path}")
+
+    try:
+        plan = get_iteration_plan(folder_name, start_name, model_count, row_count, order, index)
+    except ValueError:
+        raise ValueError(f"{model_label} '{start_name}' not found in {plural_label} list.")
+
+    if index >= plan.total:
+        if len(plan.models) < model_count:
+            raise ValueError(f"There are no more {plural_label} in the list ({plan.list_length})")
+        raise ValueError(f"Index {index} has completed the iteration of rows {row_count} against each {plural_label} indicated {model_count}.")
+
+    csv_row, model_position = plan.step(index)
+    output, entire_line = row_outputs(csv_index.get_row(csv_row))
+
+    model_full_path = plan.model_full_path(model_position)
+    model_name_only = os.path.basename(plan.models[model_position])
+    eta = format_eta(plan.record_step(index))
+
+    return tuple(output + [entire_line, row_count] + [model_full_path, model_name_only, plan.start_index + model_position + 1, plan.remaining(index), eta])
+
 
 class Soze_CSVReader:
     @classmethod
@@ -28,52 +106,76 @@ class Soze_CSVReader:
     OUTPUT_NODE = True
 
     @classmethod
-    def IS_CHANGED(self):
-        return time.time()    
+    def IS_CHANGED(self, csv_filename_path, index, csv_text=""):
+        if csv_text.strip() != '':
+            return csv_text
+        return csv_file_stamp(csv_filename_path)
     
-    def strip_quotes(self, value):
-        return value.strip('"')
-
     def read_csv(self, csv_filename_path, csv_text, index):
-        if csv_text.strip() != '':
-            csv_data = csv_text.splitlines()
-        else:
-            if csv_filename_path.strip() != "":
-                csv_path = os.path.join(os.path.dirname(__file__), "csv_files", csv_filename_path)
-                csv_path = os.path.normpath(csv_path)  # Normalize path separators
-                if not os.path.exists(csv_path):
-                    raise FileNotFoundError(f"CSV file not found: {csv_path}")
-                try:
-                    # Try utf-8 first, fallback to windows-1252 if it fails
-                    try:
-                        with open(csv_path, 'r', newline='', encoding='utf-8-sig') as csvfile:
-                            csv_data = csvfile.readlines()
-                    except UnicodeDecodeError:
-                        with open(csv_path, 'r', newline='', encoding='windows-1252') as csvfile:
-                            csv_data = csvfile.readlines()
-                except FileNotFoundError:
-                    raise  # Re-raise the FileNotFoundError
-                except Exception as e:
-                    print(f"Error reading CSV: {str(e)}")
-                    return tuple([""] * 10 + [0])
-            else:
-                return tuple([""] * 10 + [0])
+        if csv_text.strip() == '' and csv_filename_path.strip() == "":
+            return tuple([""] * 10 + [0])
+        try:
+            row_count, get_row = load_csv_rows(csv_filename_path, csv_text)
+        except FileNotFoundError:
+            raise  # Re-raise the FileNotFoundError
+        except Exception as e:
+            print(f"Error reading CSV: {str(e)}")
+            return tuple([""] * 10 + [0])
 
-        csv_reader = csv.reader(csv_data)
-        rows = list(csv_reader)
-        row_count = len(rows)
-        
         if index >= row_count:
             raise ValueError(f"There are no more rows in the CSV file ({row_count})")
         
-        row = rows[index]
-        # Strip quotes from each value in the row
-        stripped_row = [self.strip_quotes(value) for value in row]
-        output = stripped_row[:10] + [""] * (10 - len(stripped_row))
-        entire_line = ",".join(stripped_row)
+        output, entire_line = row_outputs(get_row(index))
         return tuple(output + [entire_line, row_count])
     
 
+class Soze_CSVReaderBatch:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "csv_filename_path": ("STRING", {"default": "","multiline": True}),
+                "start": ("INT", {"default": 0, "min": 0, "max": 100000000, "step": 1, "tooltip": "The first row to read."}),
+                "count": ("INT", {"default": 100, "min": 1, "max": 100000, "step": 1, "tooltip": "The number of rows to read. Fewer are returned when the file ends first."}),
+            },
+            "optional": {
+                "csv_text": ("STRING", {"default": "","multiline": True})
+            }
+        }
+
+    RETURN_NAMES = ('Column_1', 'Column_2', 'Column_3', 'Column_4', 'Column_5', 'Column_6', 'Column_7', 'Column_8', 'Column_9', 'Column_10', 'Entire_Line', 'Row_Index', 'Row_Count', 'Next_Start')
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "INT", "INT", "INT")
+    # One list entry per row, so downstream nodes run once for each row in a single execution
+    OUTPUT_IS_LIST = (True,) * 12 + (False, False)
+    FUNCTION = "read_csv_batch"
+    CATEGORY = "utils"
+    DESCRIPTION = "Reads a range of rows from a CSV file as list outputs. Shares the cached row index with CSV Reader."
+
+    @classmethod
+    def IS_CHANGED(self, csv_filename_path, start, count, csv_text=""):
+        if csv_text.strip() != '':
+            return csv_text
+        return csv_file_stamp(csv_filename_path)
+
+    def read_csv_batch(self, csv_filename_path, start, count, csv_text=""):
+        if csv_text.strip() == '' and csv_filename_path.strip() == "":
+            raise ValueError("CSV filename path or CSV text is required.")
+        row_count, get_row = load_csv_rows(csv_filename_path, csv_text)
+
+        if start >= row_count:
+            raise ValueError(f"There are no more rows in the CSV file ({row_count})")
+
+        end = min(start + count, row_count)
+        columns = [[] for _ in range(10)]
+        entire_lines = []
+        for row_index in range(start, end):
+            output, entire_line = row_outputs(get_row(row_index))
+            for column, value in zip(columns, output):
+                column.append(value)
+            entire_lines.append(entire_line)
+
+        return tuple(columns + [entire_lines, list(range(start, end)), row_count, end])
+
 
 
 class Soze_CSVReaderXCheckpoint:
@@ -86,77 +188,24 @@ class Soze_CSVReaderXCheckpoint:
                 "index": ("INT", {"default": 0, "min": 0, "max": 1000000, "control_after_generate": True, "step": 1, "tooltip": "The row number to read from the CSV file."}),
                 "start_ckpt_name": (folder_paths.get_filename_list("checkpoints"), {"tooltip": "The name of the starting LoRA."}),
                 "ckpt_count": ("INT", {"default": 1, "min": 1, "max": 100, "step": 1, "tooltip": "The number of LoRAs to load."})
+            },
+            "optional": {
+                "iteration_order": (ITERATION_ORDERS, {"default": "model_major", "tooltip": "model_major runs every row against one model before moving to the next, so each model is loaded once. row_major runs every model against one row first."}),
             }
         }
 
-    RETURN_NAMES = ('Column_1', 'Column_2', 'Column_3', 'Column_4', 'Column_5', 'Column_6', 'Column_7', 'Column_8', 'Column_9', 'Column_10', 'Entire_Line', 'Row_Count', "Ckpt_Full_Path", "Ckpt_Name_Only", "Cktp_Index")
-    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "INT", "STRING", "STRING", "INT")
+    RETURN_NAMES = ('Column_1', 'Column_2', 'Column_3', 'Column_4', 'Column_5', 'Column_6', 'Column_7', 'Column_8', 'Column_9', 'Column_10', 'Entire_Line', 'Row_Count', "Ckpt_Full_Path", "Ckpt_Name_Only", "Cktp_Index", "Remaining", "ETA")
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "INT", "STRING", "STRING", "INT", "INT", "STRING")
     FUNCTION = "process"
     CATEGORY = "utils"
     OUTPUT_NODE = True
 
     @classmethod
-    def IS_CHANGED(self, csv_filename_path, index, start_ckpt_name, ckpt_count):
-        return time.time()    
+    def IS_CHANGED(self, csv_filename_path, index, start_ckpt_name, ckpt_count, iteration_order="model_major"):
+        return csv_file_stamp(csv_filename_path)    
     
-    def strip_quotes(self, value):
-        return value.strip('"')
-
-    def process(self, csv_filename_path, index, start_ckpt_name, ckpt_count):
-        ckpt_list = folder_paths.get_filename_list("checkpoints")
-        
-        if csv_filename_path.strip() == "":
-            raise ValueError("CSV filename path cannot be empty.")
-
-        if csv_filename_path.strip() != "":
-            csv_path = os.path.join(os.path.dirname(__file__), "csv_files", csv_filename_path.strip())
-            csv_path = os.path.normpath(csv_path)  # Normalize path separators
-
-            if not os.path.exists(csv_path):
-                raise FileNotFoundError(f"CSV file not found: {csv_path}")
-            try:
-                # Try utf-8 first, fallback to windows-1252 if it fails
-                try:
-                    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as csvfile:
-                        csv_data = csvfile.readlines()
-                except UnicodeDecodeError:
-                    with open(csv_path, 'r', newline='', encoding='windows-1252') as csvfile:
-                        csv_data = csvfile.readlines()
-            except FileNotFoundError:
-                raise  # Re-raise the FileNotFoundError
-            except Exception as e:
-                print(f"Error reading CSV: {str(e)}")
-                raise ValueError(f"Error reading CSV file: {str(e)}")
-                
-
-        csv_reader = csv.reader(csv_data)
-        rows = list(csv_reader)
-        row_count = len(rows)
-        
-        try:
-            start_ckpt_index = ckpt_list.index(start_ckpt_name)
-        except ValueError:
-            raise ValueError(f"Checkpoint '{start_ckpt_name}' not found in checkpoint list.")
-        
-        csv_index = index % row_count
-        ckpt_index = start_ckpt_index + (index // row_count)
-
-        if ckpt_index >= len(ckpt_list):
-            raise ValueError(f"There are no more checkpoints in the list ({len(ckpt_list)})")
-        elif ckpt_index >= (start_ckpt_index + ckpt_count):
-            raise ValueError(f"Index {index} has completed the iteration of rows {row_count} against each checkpoint indicated {ckpt_count}.")
-        
-        row = rows[csv_index]
-        # Strip quotes from each value in the row
-        stripped_row = [self.strip_quotes(value) for value in row]
-        output = stripped_row[:10] + [""] * (10 - len(stripped_row))
-        entire_line = ",".join(stripped_row)
-
-        ckpt_full_path = folder_paths.get_full_path_or_raise("checkpoints", ckpt_list[ckpt_index])
-        
-        ckpt_name_only = os.path.basename(ckpt_list[ckpt_index])
-
-        return tuple(output + [entire_line, row_count] + [ckpt_full_path, ckpt_name_only, ckpt_index + 1])
+    def process(self, csv_filename_path, index, start_ckpt_name, ckpt_count, iteration_order="model_major"):
+        return read_sweep_step(csv_filename_path, index, "checkpoints", start_ckpt_name, ckpt_count, iteration_order, "Checkpoint", "checkpoints")
 
 
 
@@ -170,75 +219,21 @@ class Soze_CSVReaderXLora:
                 "index": ("INT", {"default": 0, "min": 0, "max": 1000000, "control_after_generate": True, "step": 1, "tooltip": "The row number to read from the CSV file."}),
                 "start_lora_name": (folder_paths.get_filename_list("loras"), {"tooltip": "The name of the starting LoRA."}),
                 "lora_count": ("INT", {"default": 1, "min": 1, "max": 100, "step": 1, "tooltip": "The number of LoRAs to load."})
+            },
+            "optional": {
+                "iteration_order": (ITERATION_ORDERS, {"default": "model_major", "tooltip": "model_major runs every row against one model before moving to the next, so each model is loaded once. row_major runs every model against one row first."}),
             }
         }
 
-    RETURN_NAMES = ('Column_1', 'Column_2', 'Column_3', 'Column_4', 'Column_5', 'Column_6', 'Column_7', 'Column_8', 'Column_9', 'Column_10', 'Entire_Line', 'Row_Count', "Lora_Full_Path", "Lora_Name_Only", "Lora_Index")
-    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "INT", "STRING", "STRING", "INT")
+    RETURN_NAMES = ('Column_1', 'Column_2', 'Column_3', 'Column_4', 'Column_5', 'Column_6', 'Column_7', 'Column_8', 'Column_9', 'Column_10', 'Entire_Line', 'Row_Count', "Lora_Full_Path", "Lora_Name_Only", "Lora_Index", "Remaining", "ETA")
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "INT", "STRING", "STRING", "INT", "INT", "STRING")
     FUNCTION = "process"
     CATEGORY = "utils"
     OUTPUT_NODE = True
 
     @classmethod
-    def IS_CHANGED(self, csv_filename_path, index, start_lora_name, lora_count):
-        return time.time()    
+    def IS_CHANGED(self, csv_filename_path, index, start_lora_name, lora_count, iteration_order="model_major"):
+        return csv_file_stamp(csv_filename_path)    
     
-    def strip_quotes(self, value):
-        return value.strip('"')
-
-    def process(self, csv_filename_path, index, start_lora_name, lora_count):
-        lora_list = folder_paths.get_filename_list("loras")
-        
-        if csv_filename_path.strip() == "":
-            raise ValueError("CSV filename path cannot be empty.")
-
-        if csv_filename_path.strip() != "":
-            csv_path = os.path.join(os.path.dirname(__file__), "csv_files", csv_filename_path.strip())
-            csv_path = os.path.normpath(csv_path)  # Normalize path separators
-
-            if not os.path.exists(csv_path):
-                raise FileNotFoundError(f"CSV file not found: {csv_path}")
-            try:
-                # Try utf-8 first, fallback to windows-1252 if it fails
-                try:
-                    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as csvfile:
-                        csv_data = csvfile.readlines()
-                except UnicodeDecodeError:
-                    with open(csv_path, 'r', newline='', encoding='windows-1252') as csvfile:
-                        csv_data = csvfile.readlines()
-            except FileNotFoundError:
-                raise  # Re-raise the FileNotFoundError
-            except Exception as e:
-                print(f"Error reading CSV: {str(e)}")
-                raise ValueError(f"Error reading CSV file: {str(e)}")
-                
-
-        csv_reader = csv.reader(csv_data)
-        rows = list(csv_reader)
-        row_count = len(rows)
-        
-        try:
-            start_lora_index = lora_list.index(start_lora_name)
-        except ValueError:
-            raise ValueError(f"Lora '{start_lora_name}' not found in lora list.")
-        
-        csv_index = index % row_count
-        lora_index = start_lora_index + (index // row_count)
-
-        if lora_index >= len(lora_list):
-            raise ValueError(f"There are no more lora in the list ({len(lora_list)})")
-        elif lora_index >= (start_lora_index + lora_count):
-            raise ValueError(f"Index {index} has completed the iteration of rows {row_count} against each lora indicated {lora_count}.")
-        
-        row = rows[csv_index]
-        # Strip quotes from each value in the row
-        stripped_row = [self.strip_quotes(value) for value in row]
-        output = stripped_row[:10] + [""] * (10 - len(stripped_row))
-        entire_line = ",".join(stripped_row)
-
-        lora_full_path = folder_paths.get_full_path_or_raise("loras", lora_list[lora_index])
-        
-        lora_name_only = os.path.basename(lora_list[lora_index])
-
-        return tuple(output + [entire_line, row_count] + [lora_full_path, lora_name_only, lora_index + 1])
-
+    def process(self, csv_filename_path, index, start_lora_name, lora_count, iteration_order="model_major"):
+        return read_sweep_step(csv_filename_path, index, "loras", start_lora_name, lora_count, iteration_order, "Lora", "lora")
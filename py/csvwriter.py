@@ -2,6 +2,8 @@ import time
 import csv
 import os
 
+from .csv_batch_writer import FLUSH_ROWS, FLUSH_SECONDS, get_csv_writer
+
 class Soze_CSVWriter:
     @classmethod
     def INPUT_TYPES(s):
@@ -20,7 +22,9 @@ class Soze_CSVWriter:
                 "value8": ("STRING", {"default": ""}),
                 "value9": ("STRING", {"default": ""}),
                 "value10": ("STRING", {"default": ""}),
-                
+                "buffered": (["False", "True"], {"default": "False", "tooltip": "Collect rows in memory and append them in batches. Pending rows are written when flush_rows are waiting, after flush_seconds, and before ComfyUI exits."}),
+                "flush_rows": ("INT", {"default": FLUSH_ROWS, "min": 1, "max": 100000, "tooltip": "Buffered mode: write once this many rows are waiting."}),
+                "flush_seconds": ("FLOAT", {"default": FLUSH_SECONDS, "min": 0.5, "max": 3600.0, "step": 0.5, "tooltip": "Buffered mode: write rows that have waited this long."}),
             }
         }
 
@@ -31,14 +35,14 @@ class Soze_CSVWriter:
     OUTPUT_NODE = True
 
     @classmethod
-    def IS_CHANGED(self, csv_filename_path, value1="", value2="", value3="", value4="", value5="", value6="", value7="", value8="", value9="", value10=""):
+    def IS_CHANGED(self, csv_filename_path, value1="", value2="", value3="", value4="", value5="", value6="", value7="", value8="", value9="", value10="", buffered="False", flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
         return time.time()
     
     def wrap_quotes(self, value):
         value = value.replace('"', "'")
         return f'"{value}"'
 
-    def write_csv(self, csv_filename_path, value1="", value2="", value3="", value4="", value5="", value6="", value7="", value8="", value9="", value10=""):
+    def write_csv(self, csv_filename_path, value1="", value2="", value3="", value4="", value5="", value6="", value7="", value8="", value9="", value10="", buffered="False", flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
         values = [value1, value2, value3, value4, value5, value6, value7, value8, value9, value10]
 
         # Filter out empty values
@@ -57,19 +61,17 @@ class Soze_CSVWriter:
             os.makedirs(os.path.dirname(csv_filename_path), exist_ok=True)
             
             
-            # Append the line to the CSV file, creating it if it doesn't exist
-            retries = 3
-            for attempt in range(retries):
-                try:
-                    with open(csv_filename_path, 'a', newline='', encoding='utf-8') as csvfile:
-                        csvfile.write(csv_line)
-                    return csv_line
-                except Exception as e:
-                    if attempt < retries - 1:
-                        time.sleep(5)
-                    else:
-                        raise FileNotFoundError(f"CSV file not found: {csv_filename_path}") from e
-            return ""
+            # Append the line to the CSV file, creating it if it doesn't exist. Appends go through
+            # one writer per path that holds an advisory lock, so concurrent writers never interleave rows
+            writer = get_csv_writer(csv_filename_path)
+            try:
+                if buffered == "True":
+                    writer.append(csv_line, flush_rows, flush_seconds)
+                else:
+                    writer.write(csv_line)
+            except OSError as e:
+                raise FileNotFoundError(f"CSV file not found: {csv_filename_path}") from e
+            return csv_line
                 
         else:
             return ""
\ No newline at end of file
@@ -2,10 +2,8 @@ import os
 import time
 import folder_paths
 
-from .utils import (
-    read_from_file,
-    write_to_file
-)
+from .state_store import STATE, node_namespace
+from .folder_index import list_folder_files
 
 
 
@@ -22,6 +20,9 @@ class Soze_LoadFilesFromFolder:
             "optional": {
                 "file_load_count": ("INT", {"default": 1, "min": 0, "step": 1}),
                 "index": ("INT", {"default": 0, "min": 0, "max": 1000000, "control_after_generate": True, "step": 1}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
@@ -31,44 +32,28 @@ class Soze_LoadFilesFromFolder:
 
     CATEGORY = "file"
 
-    def load_files(self, input_folder, input_file_extensions, file_load_count=1, index=0):
+    def load_files(self, input_folder, input_file_extensions, file_load_count=1, index=0, unique_id=None):
         if not os.path.isdir(input_folder):
             raise FileNotFoundError(f"Folder not found: {input_folder}")
             
-        dir_files = os.listdir(input_folder)
-        if len(dir_files) == 0:
-            raise FileNotFoundError(f"Folder is empty: {input_folder}")
-
-        # Filter files by provided extensions
+        # Filter files by provided extensions, the sorted listing is cached until the folder changes
         valid_extensions = [ext.strip().lower() for ext in input_file_extensions.split(',')]
-        dir_files = [f for f in dir_files if any(f.lower().endswith(ext) for ext in valid_extensions)]
-        
+        dir_files = list_folder_files(input_folder, valid_extensions)
+
         if not dir_files:
             raise FileNotFoundError(f"No files found with extensions: {input_file_extensions}")
 
-        dir_files = sorted(dir_files)
-        dir_files = [os.path.join(input_folder, x) for x in dir_files]
-
         # Start at index
-        dir_files = dir_files[index:]
-
-        file_paths = []
-        limit_files = file_load_count > 0
-        file_count = 0
-
-        for file_path in dir_files:
-            if limit_files and file_count >= file_load_count:
-                break
-            if os.path.isfile(file_path):
-                file_paths.append(file_path)
-                file_count += 1
+        if file_load_count > 0:
+            file_paths = list(dir_files[index:index + file_load_count])
+        else:
+            file_paths = list(dir_files[index:])
 
         if len(file_paths) == 0:
             raise FileNotFoundError(f"No valid files found in: {input_folder}")
 
         current_file = file_paths[0]
-        previous_file = read_from_file('sozefilebatchcache.txt')
-        write_to_file('sozefilebatchcache.txt', current_file)
+        STATE.set(node_namespace(unique_id, "Soze_LoadFilesFromFolder"), "previous_file", current_file)
 
         return (current_file, len(file_paths), input_folder, os.path.basename(current_file), os.path.splitext(os.path.basename(current_file))[0])
 
@@ -0,0 +1,64 @@
+#Cached directory listings for the nodes that walk a folder by index.
+#A listing is built once with os.scandir and reused until the folder's mtime changes,
+#so stepping through a large folder one index at a time does not re-list it every run.
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+MAX_CACHED_FOLDERS = 64
+
+_folder_index: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[Tuple[int, int], Tuple[str, ...]]]" = OrderedDict()
+_folder_index_lock = threading.Lock()
+
+
+def _normalize_extensions(extensions: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    if extensions is None:
+        return ()
+    return tuple(sorted({ext.strip().lower() for ext in extensions if ext.strip()}))
+
+
+def list_folder_files(folder: str, extensions: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """
+    Returns the sorted full paths of the files in folder, optionally filtered by extension.
+    The result is cached per (folder, extensions) and rebuilt only when the folder's mtime changes.
+    """
+    exts = _normalize_extensions(extensions)
+    folder_stat = os.stat(folder)
+    stamp = (folder_stat.st_mtime_ns, folder_stat.st_ino)
+    key = (folder, exts)
+
+    with _folder_index_lock:
+        cached = _folder_index.get(key)
+        if cached is not None and cached[0] == stamp:
+            _folder_index.move_to_end(key)
+            return cached[1]
+
+    names = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if exts and not entry.name.lower().endswith(exts):
+                continue
+            if not entry.is_file():
+                continue
+            names.append(entry.name)
+    names.sort()
+    files = tuple(os.path.join(folder, name) for name in names)
+
+    with _folder_index_lock:
+        _folder_index[key] = (stamp, files)
+        _folder_index.move_to_end(key)
+        while len(_folder_index) > MAX_CACHED_FOLDERS:
+            _folder_index.popitem(last=False)
+
+    return files
+
+
+def clear_folder_index(folder: Optional[str] = None):
+    with _folder_index_lock:
+        if folder is None:
+            _folder_index.clear()
+        else:
+            for key in [key for key in _folder_index if key[0] == folder]:
+                del _folder_index[key]
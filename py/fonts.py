@@ -0,0 +1,76 @@
+#Process-wide font registry for the nodes that draw labels.
+#Fonts are resolved and loaded once per (family, size) and reused by every execution.
+#Set SOZE_FONT_PATH to a .ttf/.otf file (or drop one into the fonts folder of this package)
+#to skip matplotlib entirely; otherwise matplotlib's font manager is imported on first use only.
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import ImageFont
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts")
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+
+_font_paths: Dict[Optional[str], Optional[str]] = {}
+_fonts: Dict[Tuple[Optional[str], int], ImageFont.FreeTypeFont] = {}
+_fonts_lock = threading.Lock()
+
+
+def _configured_font_path() -> Optional[str]:
+    font_path = os.environ.get("SOZE_FONT_PATH")
+    if font_path and os.path.isfile(font_path):
+        return font_path
+    if os.path.isdir(FONTS_DIR):
+        for name in sorted(os.listdir(FONTS_DIR)):
+            if name.lower().endswith(FONT_EXTENSIONS):
+                return os.path.join(FONTS_DIR, name)
+    return None
+
+
+def _find_font_path(family: Optional[str]) -> Optional[str]:
+    # A configured font always wins, so matplotlib is never imported when one is set
+    font_path = _configured_font_path()
+    if font_path is not None:
+        return font_path
+    try:
+        import matplotlib.font_manager as fm
+        if family is None:
+            return fm.findfont(fm.FontProperties())
+        return fm.findfont(fm.FontProperties(family=family))
+    except Exception as e:
+        print(f"Could not resolve font {family or 'default'}: {e}")
+        return None
+
+
+def get_font_path(family: Optional[str] = None) -> Optional[str]:
+    with _fonts_lock:
+        if family in _font_paths:
+            return _font_paths[family]
+    font_path = _find_font_path(family)
+    with _fonts_lock:
+        return _font_paths.setdefault(family, font_path)
+
+
+def get_font(size: int, family: Optional[str] = None) -> ImageFont.FreeTypeFont:
+    """Returns the font for (family, size), loading it on first use. family None is the default font."""
+    key = (family, int(size))
+    with _fonts_lock:
+        font = _fonts.get(key)
+    if font is not None:
+        return font
+
+    font_path = get_font_path(family)
+    if font_path is not None:
+        font = ImageFont.truetype(font_path, int(size))
+    else:
+        font = ImageFont.load_default(int(size))
+
+    with _fonts_lock:
+        return _fonts.setdefault(key, font)
+
+
+def clear_fonts():
+    with _fonts_lock:
+        _fonts.clear()
+        _font_paths.clear()
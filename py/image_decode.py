@@ -0,0 +1,324 @@
+#Shared image decode used by all of the Soze image loaders.
+#Files are decoded on a thread pool (PIL and numpy release the GIL while they work)
+#and the pixels are written straight into one preallocated output tensor per batch.
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+from PIL import Image, ImageOps, ImageSequence
+from comfy.utils import common_upscale
+
+import node_helpers
+
+
+EXCLUDED_FORMATS = ['MPO']
+
+# "float32" is what every ComfyUI node expects. The compact types keep batches 2x/4x smaller in host
+# memory, use Soze Image To Float to convert them (on the GPU if wanted) before other nodes
+OUTPUT_DTYPES = ["float32", "float16", "uint8"]
+_TORCH_DTYPES = {"float32": torch.float32, "float16": torch.float16, "uint8": torch.uint8}
+DECODE_WORKERS = min(8, os.cpu_count() or 1)
+PREFETCH_WORKERS = 2
+
+_executor: Optional[ThreadPoolExecutor] = None
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_decode_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="soze_decode")
+    return _executor
+
+
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    # Kept separate from the decode pool so background work never queues ahead of a running load
+    global _prefetch_executor
+    if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="soze_prefetch")
+    return _prefetch_executor
+
+
+class DecodedImage:
+    """Frames of a single image file, kept as uint8 until they are written to a tensor."""
+
+    def __init__(self, filepath: str, frames: List[np.ndarray], alphas: List[Optional[np.ndarray]]):
+        self.filepath = filepath
+        self.frames = frames
+        self.alphas = alphas
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frames)
+
+    @property
+    def height(self) -> int:
+        return self.frames[0].shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.frames[0].shape[1]
+
+    @property
+    def has_alpha(self) -> bool:
+        return any(alpha is not None for alpha in self.alphas)
+
+
+def decode_image_file(filepath: str) -> DecodedImage:
+    img = node_helpers.pillow(Image.open, filepath)
+
+    frames = []
+    alphas = []
+    w, h = None, None
+
+    for i in ImageSequence.Iterator(img):
+        i = node_helpers.pillow(ImageOps.exif_transpose, i)
+
+        if i.mode == 'I':
+            i = i.point(lambda i: i * (1 / 255))
+        image = i.convert("RGB")
+
+        if len(frames) == 0:
+            w = image.size[0]
+            h = image.size[1]
+
+        if image.size[0] != w or image.size[1] != h:
+            continue
+
+        frames.append(np.asarray(image))
+        alphas.append(np.asarray(i.getchannel('A')) if 'A' in i.getbands() else None)
+
+        # Only the first frame of these formats is ever used
+        if img.format in EXCLUDED_FORMATS:
+            break
+
+    if len(frames) == 0:
+        raise ValueError(f"No frames could be decoded from image: {filepath}")
+
+    return DecodedImage(filepath, frames, alphas)
+
+
+def decode_image_files(filepaths: List[str]) -> List[DecodedImage]:
+    if len(filepaths) == 1:
+        return [decode_image_file(filepaths[0])]
+    return list(get_decode_executor().map(decode_image_file, filepaths))
+
+
+def _write_frame(out: np.ndarray, frame: np.ndarray):
+    if out.dtype == np.uint8:
+        np.copyto(out, frame)
+    else:
+        # Computed in float32 and cast on write for float16 outputs
+        np.divide(frame, np.float32(255.0), out=out, dtype=np.float32)
+
+
+def _write_mask(out: np.ndarray, alpha: Optional[np.ndarray]):
+    if alpha is None:
+        out.fill(0.)
+    else:
+        # mask = 1 - alpha / 255
+        np.divide(alpha, np.float32(-255.0), out=out, dtype=np.float32)
+        out += out.dtype.type(1.)
+
+
+def _run_jobs(fn, *job_args):
+    jobs = list(zip(*job_args))
+    if len(jobs) > 1:
+        list(get_decode_executor().map(lambda job: fn(*job), jobs))
+    else:
+        for job in jobs:
+            fn(*job)
+
+
+def _decoded_to_float(decoded: DecodedImage) -> torch.Tensor:
+    image = torch.empty((decoded.frame_count, decoded.height, decoded.width, 3), dtype=torch.float32)
+    _run_jobs(_write_frame, list(image.numpy()), decoded.frames)
+    return image
+
+
+def _decoded_mask_to_float(decoded: DecodedImage) -> torch.Tensor:
+    mask = torch.empty((decoded.frame_count, decoded.height, decoded.width), dtype=torch.float32)
+    _run_jobs(_write_mask, list(mask.numpy()), decoded.alphas)
+    return mask
+
+
+def _cast_image(image: torch.Tensor, output_dtype: str) -> torch.Tensor:
+    if output_dtype == "uint8":
+        return image.mul(255.0).round_().clamp_(0, 255).to(torch.uint8)
+    return image.to(_TORCH_DTYPES[output_dtype])
+
+
+def _mask_dtype(output_dtype: str) -> torch.dtype:
+    return torch.float32 if output_dtype == "float32" else torch.float16
+
+
+def empty_mask(count: int, dtype: torch.dtype = torch.float32) -> torch.Tensor:
+    # A fresh tensor every time, downstream nodes may edit masks in place
+    return torch.zeros((count, 64, 64), dtype=dtype)
+
+
+def stack_frames(frames: List[np.ndarray], output_dtype: str = "float32") -> torch.Tensor:
+    """Writes equally sized uint8 (H, W, C) frames into one preallocated (N, H, W, C) tensor."""
+    if len(frames) == 0:
+        raise ValueError("No images to create a batch from")
+    h, w, c = frames[0].shape
+    output = torch.empty((len(frames), h, w, c), dtype=_TORCH_DTYPES[output_dtype])
+    _run_jobs(_write_frame, list(output.numpy()), frames)
+    return output
+
+
+def build_image_batch(decoded_images: List[DecodedImage], output_dtype: str = "float32", with_mask: bool = True) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Assembles decoded files into one (N, H, W, 3) image batch and (N, H, W) mask batch.
+
+    Both outputs are allocated once at their final size. Frames matching the size of the
+    first file are written directly into their slot; mismatched frames are resized into it.
+    With a compact output_dtype the image stays uint8/float16 and the mask is float16.
+    When with_mask is False, or no file has alpha, the mask is an empty 64x64 mask per frame.
+    """
+    if len(decoded_images) == 0:
+        raise ValueError("No images to create a batch from")
+
+    first = decoded_images[0]
+    h, w = first.height, first.width
+    if first.has_alpha:
+        mask_h, mask_w = h, w
+    else:
+        mask_h, mask_w = 64, 64
+    total = sum(decoded.frame_count for decoded in decoded_images)
+    build_mask = with_mask and any(decoded.has_alpha for decoded in decoded_images)
+
+    output_image = torch.empty((total, h, w, 3), dtype=_TORCH_DTYPES[output_dtype])
+    image_np = output_image.numpy()
+    if build_mask:
+        output_mask = torch.empty((total, mask_h, mask_w), dtype=_mask_dtype(output_dtype))
+        mask_np = output_mask.numpy()
+    else:
+        output_mask = empty_mask(total, _mask_dtype(output_dtype))
+
+    frame_slots, frames = [], []
+    mask_slots, alphas = [], []
+    offset = 0
+    for decoded in decoded_images:
+        count = decoded.frame_count
+        image_slot = output_image[offset:offset + count]
+
+        if decoded.height == h and decoded.width == w:
+            frame_slots.extend(image_np[offset:offset + count])
+            frames.extend(decoded.frames)
+        else:
+            resized = common_upscale(_decoded_to_float(decoded).movedim(-1, 1), w, h, "bilinear", "center")
+            image_slot.copy_(_cast_image(resized.movedim(1, -1), output_dtype))
+
+        if not build_mask:
+            pass
+        elif not decoded.has_alpha:
+            output_mask[offset:offset + count].fill_(0.)
+        elif decoded.height == mask_h and decoded.width == mask_w:
+            mask_slots.extend(mask_np[offset:offset + count])
+            alphas.extend(decoded.alphas)
+        else:
+            mask = _decoded_mask_to_float(decoded).unsqueeze(1)
+            mask = torch.nn.functional.interpolate(mask, size=(mask_h, mask_w), mode='bilinear', align_corners=False)
+            output_mask[offset:offset + count].copy_(mask.squeeze(1))
+
+        offset += count
+
+    _run_jobs(_write_frame, frame_slots, frames)
+    _run_jobs(_write_mask, mask_slots, alphas)
+
+    return (output_image, output_mask)
+
+
+def decoded_to_tensors(decoded: DecodedImage, output_dtype: str = "float32", with_mask: bool = True) -> Tuple[torch.Tensor, torch.Tensor]:
+    return build_image_batch([decoded], output_dtype, with_mask)
+
+
+def load_image_file(filepath: str, output_dtype: str = "float32", with_mask: bool = True) -> Tuple[torch.Tensor, torch.Tensor]:
+    return decoded_to_tensors(decode_image_file(filepath), output_dtype, with_mask)
+
+
+def load_image_files(filepaths: List[str], output_dtype: str = "float32", with_mask: bool = True) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+    return [decoded_to_tensors(decoded, output_dtype, with_mask) for decoded in decode_image_files(filepaths)]
+
+
+def load_image_batch(filepaths: List[str], output_dtype: str = "float32", with_mask: bool = True) -> Tuple[torch.Tensor, torch.Tensor]:
+    return build_image_batch(decode_image_files(filepaths), output_dtype, with_mask)
+
+
+def to_float_image(image: torch.Tensor, device: Optional[torch.device] = None) -> torch.Tensor:
+    """Converts a compact uint8/float16 image to the float32 [0, 1] IMAGE other nodes expect.
+    Moving to the device first means only the compact pixels cross the bus."""
+    if device is not None:
+        image = image.to(device)
+    if image.dtype == torch.uint8:
+        return image.to(torch.float32).div_(255.0)
+    return image.to(torch.float32)
+
+
+def convert_image_dtype(image: torch.Tensor, output_dtype: str) -> torch.Tensor:
+    """Converts an image between the OUTPUT_DTYPES, returning it unchanged when it already matches."""
+    if image.dtype == _TORCH_DTYPES[output_dtype]:
+        return image
+    return _cast_image(to_float_image(image), output_dtype)
+
+
+class ImagePrefetcher:
+    """
+    Bounded LRU of decoded images for loaders that walk a folder by index.
+    The files a run needs are returned from the cache (decoding any misses in parallel) and the
+    upcoming files are decoded in the background, so the next run finds its input ready.
+    Entries are keyed on path and invalidated when the file's mtime or size changes.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Future]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(filepath: str) -> Tuple[int, int]:
+        st = os.stat(filepath)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _lookup(self, filepath: str, executor: ThreadPoolExecutor) -> Future:
+        # Caller holds the lock
+        stamp = self._stamp(filepath)
+        entry = self._entries.get(filepath)
+        if entry is not None:
+            future = entry[1]
+            failed = future.cancelled() or (future.done() and future.exception() is not None)
+            if entry[0] == stamp and not failed:
+                self._entries.move_to_end(filepath)
+                return future
+        future = executor.submit(decode_image_file, filepath)
+        self._entries[filepath] = (stamp, future)
+        # A replaced entry keeps its old LRU position, move it so this run's files are not evicted
+        self._entries.move_to_end(filepath)
+        return future
+
+    def decode(self, filepaths: List[str], upcoming: List[str]) -> List[DecodedImage]:
+        with self._lock:
+            futures = [self._lookup(filepath, get_decode_executor()) for filepath in filepaths]
+            for filepath in upcoming:
+                try:
+                    self._lookup(filepath, get_prefetch_executor())
+                except OSError:
+                    pass
+
+            # Keep only the current window and the upcoming files
+            capacity = len(filepaths) + len(upcoming)
+            while len(self._entries) > capacity:
+                _, (_, future) = self._entries.popitem(last=False)
+                future.cancel()
+
+        return [future.result() for future in futures]
+
+    def clear(self):
+        with self._lock:
+            for _, future in self._entries.values():
+                future.cancel()
+            self._entries.clear()
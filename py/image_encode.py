@@ -0,0 +1,153 @@
+#Shared image encode used by the Soze save nodes.
+#Frames are quantized to uint8 once per batch and encoded on a thread pool (zlib and PIL's encoders
+#release the GIL). Writes can also be left running in the background; they are always
+#flushed before the process exits.
+
+import atexit
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+ENCODE_WORKERS = min(8, os.cpu_count() or 1)
+
+IMAGE_FORMATS = ["png", "webp", "jpeg", "npy", "raw"]
+FORMAT_EXTENSIONS = {"png": "png", "webp": "webp", "jpeg": "jpg", "npy": "npy", "raw": "raw"}
+# Formats the ComfyUI frontend can preview
+PREVIEW_FORMATS = ("png", "webp", "jpeg")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending: "set[Future]" = set()
+_pending_lock = threading.Lock()
+_reserved_counters: Dict[Tuple[str, str], int] = {}
+
+
+def get_encode_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="soze_encode")
+    return _executor
+
+
+def build_png_metadata(prompt=None, extra_pnginfo=None) -> PngInfo:
+    """Serializes the workflow metadata once so it can be shared by every image of a batch."""
+    metadata = PngInfo()
+    if prompt is not None:
+        metadata.add_text("prompt", json.dumps(prompt))
+    if extra_pnginfo is not None:
+        for x in extra_pnginfo:
+            metadata.add_text(x, json.dumps(extra_pnginfo[x]))
+    return metadata
+
+
+def images_to_uint8(images: torch.Tensor) -> np.ndarray:
+    # Quantized on the tensor's device so only uint8 pixels are copied back to the host
+    if images.dtype == torch.uint8:
+        return images.cpu().numpy()
+    return images.mul(255.).clamp_(0, 255).to(torch.uint8).cpu().numpy()
+
+
+def write_image(pixels: np.ndarray, fp: Union[str, BinaryIO], image_format: str = "png", metadata: Optional[PngInfo] = None, compress_level: int = 4, quality: int = 95):
+    """
+    Encodes one uint8 (H, W, C) frame to a path or binary file object.
+    png: zlib level compress_level (0 stores, 1 is the fast preset), keeps the workflow metadata.
+    webp: lossless, compress_level (0-6) is the encoder effort.
+    jpeg: quality with no chroma subsampling, alpha is dropped.
+    npy: numpy .npy with its shape header. raw: the bare pixel bytes, row major HWC.
+    """
+    if image_format == "png":
+        Image.fromarray(pixels).save(fp, format="PNG", pnginfo=metadata, compress_level=compress_level)
+    elif image_format == "webp":
+        Image.fromarray(pixels).save(fp, format="WEBP", lossless=True, method=min(compress_level, 6))
+    elif image_format == "jpeg":
+        Image.fromarray(np.ascontiguousarray(pixels[..., :3])).save(fp, format="JPEG", quality=quality, subsampling=0)
+    elif image_format == "npy":
+        np.save(fp, pixels)
+    elif image_format == "raw":
+        if isinstance(fp, str):
+            pixels.tofile(fp)
+        else:
+            fp.write(pixels.tobytes())
+    else:
+        raise ValueError(f"Unknown image format: {image_format}")
+
+
+def benchmark_encoders(pixels: np.ndarray, image_formats: List[str], compress_level: int = 4, quality: int = 95) -> List[Dict[str, float]]:
+    """
+    Encodes every uint8 frame of pixels in memory with each format on a single thread.
+    Returns per format the seconds taken, encoded bytes, input megabytes per second and compression ratio.
+    """
+    input_bytes = pixels.nbytes
+    results = []
+    for image_format in image_formats:
+        encoded_bytes = 0
+        start = time.perf_counter()
+        for frame in pixels:
+            buffer = io.BytesIO()
+            write_image(frame, buffer, image_format, None, compress_level, quality)
+            encoded_bytes += buffer.tell()
+        seconds = max(time.perf_counter() - start, 1e-9)
+        results.append({
+            "format": image_format,
+            "seconds": seconds,
+            "bytes": encoded_bytes,
+            "mb_per_s": input_bytes / seconds / (1024 * 1024),
+            "ratio": input_bytes / max(encoded_bytes, 1),
+        })
+    return results
+
+
+def _finish(future: Future):
+    with _pending_lock:
+        _pending.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error writing image in background: {future.exception()}")
+
+
+def submit_writes(jobs: List[tuple], write_fn=write_image, background: bool = False) -> List[Future]:
+    """
+    Runs write_fn(*job) for each job on the encode pool.
+    Waits for all of them unless background is set, in which case they are tracked until flush_pending_writes.
+    """
+    executor = get_encode_executor()
+    futures = [executor.submit(write_fn, *job) for job in jobs]
+    if background:
+        with _pending_lock:
+            _pending.update(futures)
+        for future in futures:
+            future.add_done_callback(_finish)
+    else:
+        for future in futures:
+            future.result()
+    return futures
+
+
+def flush_pending_writes(timeout: Optional[float] = None):
+    """Blocks until every background write has finished."""
+    with _pending_lock:
+        pending = list(_pending)
+    if pending:
+        wait(pending, timeout=timeout)
+
+
+def reserve_counter(folder: str, filename: str, counter: int, count: int) -> int:
+    """
+    Returns the first free counter for count files and reserves them.
+    get_save_image_path only sees files already on disk, so this keeps background writes from reusing numbers.
+    """
+    key = (folder, filename)
+    with _pending_lock:
+        counter = max(counter, _reserved_counters.get(key, 0))
+        _reserved_counters[key] = counter + count
+    return counter
+
+
+atexit.register(flush_pending_writes)
@@ -1,3 +1,4 @@
+import functools
 import torch
 import os
 import re
@@ -6,6 +7,8 @@ import hashlib
 import re
 import requests
 import json
+import threading
+from collections import OrderedDict
 from numpy import ndarray
 from comfy.cli_args import args
 from PIL.PngImagePlugin import PngInfo
@@ -17,25 +20,42 @@ from typing import Any, Dict, List, Tuple, Union, Optional, Callable, TYPE_CHECK
 
 from PIL import ImageFont, ImageDraw, Image
 from torchvision.transforms.functional import to_pil_image
-import matplotlib.font_manager as fm
 from torch import Tensor
 
 from .utils import (
     zip_with_fill,
     tensor2pil,
     pil2tensor,
-    read_from_file,
-    write_to_file
+    file_fingerprint
+)
+from .state_store import STATE, node_namespace
+from .folder_index import list_folder_files
+from .fonts import get_font
+from .tensor_cache import TENSOR_CACHE_DTYPES, TENSOR_CACHE_EXTENSION, read_tensor_cache, write_tensor_cache
+from .image_encode import FORMAT_EXTENSIONS, IMAGE_FORMATS, PREVIEW_FORMATS, benchmark_encoders, build_png_metadata, images_to_uint8, reserve_counter, submit_writes, write_image
+from .image_decode import (
+    OUTPUT_DTYPES,
+    ImagePrefetcher,
+    build_image_batch,
+    convert_image_dtype,
+    decode_image_files,
+    decoded_to_tensors,
+    load_image_file,
+    stack_frames,
+    to_float_image
 )
 if TYPE_CHECKING:
     from mypy.typeshed.stdlib._typeshed import SupportsDunderGT, SupportsDunderLT
 
 from PIL import Image, ImageOps, ImageSequence, ImageFile
 from comfy.utils import ProgressBar, common_upscale
+import comfy.model_management
 
 import node_helpers
 import folder_paths
 
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
+
 def pil2tensor(images: Image.Image | list[Image.Image]) -> torch.Tensor:
     """Converts a PIL Image or a list of PIL Images to a tensor."""
 
@@ -60,6 +80,13 @@ class Soze_LoadImage:
         files = [f for f in os.listdir(input_dir) if os.path.isfile(os.path.join(input_dir, f))]
         return {"required":
                     {"image": (sorted(files), {"image_upload": True})},
+                "optional":
+                    {"Fast_Hash": ("BOOLEAN", {"default": False, "tooltip": "Detect changes by hashing sampled chunks plus size and modified time instead of the whole file. Faster for very large images."}),
+                     "Output_Dtype": (OUTPUT_DTYPES, {"default": "float32", "tooltip": "float16/uint8 keep the loaded pixels 2x/4x smaller in memory. Most nodes expect float32, convert with Image To Float (Soze) before using them."}),
+                     "Generate_Mask": ("BOOLEAN", {"default": True, "tooltip": "Build the mask from the alpha channel. Disable when nothing uses the mask to skip the work, an empty 64x64 mask is returned instead."}),
+                    },
+                "hidden":
+                    {"unique_id": "UNIQUE_ID"},
                 }
 
     CATEGORY = "image"
@@ -67,81 +94,38 @@ class Soze_LoadImage:
     RETURN_NAMES = ("Image", "Mask", "Image_Filename_Path", "Image_Filename", "Image_Filename_No_Ext", "Image_Changed")
     RETURN_TYPES = ("IMAGE", "MASK", "STRING", "STRING", "STRING", "BOOL")
     FUNCTION = "load_image"
-    def load_image(self, image):
+    def load_image(self, image, Fast_Hash=False, Output_Dtype="float32", Generate_Mask=True, unique_id=None):
         input_filepath = folder_paths.get_annotated_filepath(image)
         input_filename = os.path.basename(input_filepath)
         input_filename_no_ext = os.path.splitext(input_filename)[0]
 
-        img = node_helpers.pillow(Image.open, input_filepath)
-        
-        output_images = []
-        output_masks = []
-        w, h = None, None
-
-        excluded_formats = ['MPO']
-        
-        for i in ImageSequence.Iterator(img):
-            i = node_helpers.pillow(ImageOps.exif_transpose, i)
-
-            if i.mode == 'I':
-                i = i.point(lambda i: i * (1 / 255))
-            image = i.convert("RGB")
-
-            if len(output_images) == 0:
-                w = image.size[0]
-                h = image.size[1]
-            
-            if image.size[0] != w or image.size[1] != h:
-                continue
-            
-            image = np.array(image).astype(np.float32) / 255.0
-            image = torch.from_numpy(image)[None,]
-            if 'A' in i.getbands():
-                mask = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                mask = 1. - torch.from_numpy(mask)
-            else:
-                mask = torch.zeros((64,64), dtype=torch.float32, device="cpu")
-            output_images.append(image)
-            output_masks.append(mask.unsqueeze(0))
-
-        if len(output_images) > 1 and img.format not in excluded_formats:
-            output_image = torch.cat(output_images, dim=0)
-            output_mask = torch.cat(output_masks, dim=0)
-        else:
-            output_image = output_images[0]
-            output_mask = output_masks[0]
+        output_image, output_mask = load_image_file(input_filepath, Output_Dtype, Generate_Mask)
 
-        previous_input_filename = read_from_file('sozeimagecache.txt')
-        write_to_file('sozeimagecache.txt', input_filename)
+        previous_input_filename = STATE.swap(node_namespace(unique_id, "Soze_LoadImage"), "previous_filename", input_filename)
         return (output_image, output_mask, input_filepath, input_filename, input_filename_no_ext, previous_input_filename != input_filename)
 
     @classmethod
-    def IS_CHANGED(s, image):
-        previous_input_filepath = s.read_previous_image_filename()
+    def IS_CHANGED(s, image, Fast_Hash=False, Output_Dtype="float32", Generate_Mask=True, unique_id=None):
+        previous_input_filepath = STATE.get(node_namespace(unique_id, "Soze_LoadImage"), "previous_filename")
         if previous_input_filepath != image:
             return True
         image_path = folder_paths.get_annotated_filepath(image)
-        m = hashlib.sha256()
-        with open(image_path, 'rb') as f:
-            m.update(f.read())
-        return m.digest().hex()
+        # Only rehashes when the file's size, mtime or inode change
+        return file_fingerprint(image_path, Fast_Hash)
 
     @classmethod
-    def VALIDATE_INPUTS(s, image):
+    def VALIDATE_INPUTS(s, image, Fast_Hash=False, Output_Dtype="float32", Generate_Mask=True, unique_id=None):
         if not folder_paths.exists_annotated_filepath(image):
             return "Invalid image file: {}".format(image)
 
         return True
     
-    def read_previous_image_filename():
-        try:
-            return read_from_file('sozeimagecache.txt')
-        except Exception:
-            return ""
-    
 # Code from https://github.com/kijai/ComfyUI-KJNodes 
 # Added filename outputs etc
 class Soze_LoadImagesFromFolder:
+    def __init__(self):
+        self.prefetcher = ImagePrefetcher()
+
     @classmethod
     def INPUT_TYPES(s):
         return {
@@ -151,6 +135,12 @@ class Soze_LoadImagesFromFolder:
             "optional": {
                 "Image_Load_Count": ("INT", {"default": 1, "min": 0, "step": 1}),
                 "index": ("INT", {"default": 0, "min": 0, "max": 1000000, "control_after_generate": True, "step": 1}),
+                "Prefetch_Depth": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1, "tooltip": "Number of upcoming images to decode in the background for the next run. 0 disables prefetching."}),
+                "Output_Dtype": (OUTPUT_DTYPES, {"default": "float32", "tooltip": "float16/uint8 keep the loaded pixels 2x/4x smaller in memory. Most nodes expect float32, convert with Image To Float (Soze) before using them."}),
+                "Generate_Mask": ("BOOLEAN", {"default": True, "tooltip": "Build the mask from the alpha channel. Disable when nothing uses the mask to skip the work, an empty 64x64 mask is returned instead."}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
@@ -160,114 +150,50 @@ class Soze_LoadImagesFromFolder:
 
     CATEGORY = "image"
 
-    def load_images(self, Input_Folder, Image_Load_Count, index):
+    def load_images(self, Input_Folder, Image_Load_Count, index, Prefetch_Depth=0, Output_Dtype="float32", Generate_Mask=True, unique_id=None):
         if not os.path.isdir(Input_Folder):
             raise FileNotFoundError(f"Folder not found: {Input_Folder}")
-        dir_files = os.listdir(Input_Folder)
-        if len(dir_files) == 0:
-            raise FileNotFoundError(f"Folder only has {len(dir_files)} files in it: {Input_Folder}")
-
-        # Filter files by extension
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.webp']
-        dir_files = [f for f in dir_files if any(f.lower().endswith(ext) for ext in valid_extensions)]
-
-        dir_files = sorted(dir_files)
-        dir_files = [os.path.join(Input_Folder, x) for x in dir_files]
 
-        # start at start_index
-        dir_files = dir_files[index:]
+        # Filtered, sorted listing is cached until the folder changes
+        folder_files = list_folder_files(Input_Folder, IMAGE_EXTENSIONS)
+        if len(folder_files) == 0:
+            raise FileNotFoundError(f"Folder only has {len(folder_files)} images in it: {Input_Folder}")
 
-        images = []
-        masks = []
-        image_path_list = []
-
-        limit_images = False
+        # start at start_index, only slicing out the files that will be loaded
         if Image_Load_Count > 0:
-            limit_images = True
-        image_count = 0
-
-        excluded_formats = ['MPO']
-
-        for image_path in dir_files:
-            if os.path.isdir(image_path):
-                continue
-            if limit_images and image_count >= Image_Load_Count:
-                break
-
-            input_filepath = folder_paths.get_annotated_filepath(image_path)
-            input_filename = os.path.basename(input_filepath)
-            input_filename_no_ext = os.path.splitext(input_filename)[0]
-
-            img = node_helpers.pillow(Image.open, input_filepath)
-
-            output_images = []
-            output_masks = []
-            w, h = None, None
-
-            for i in ImageSequence.Iterator(img):
-                i = node_helpers.pillow(ImageOps.exif_transpose, i)
-
-                if i.mode == 'I':
-                    i = i.point(lambda i: i * (1 / 255))
-                image = i.convert("RGB")
-
-                if len(output_images) == 0:
-                    w = image.size[0]
-                    h = image.size[1]
-
-                if image.size[0] != w or image.size[1] != h:
-                    continue
-
-                image = np.array(image).astype(np.float32) / 255.0
-                image = torch.from_numpy(image)[None,]
-                if 'A' in i.getbands():
-                    mask = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                    mask = 1. - torch.from_numpy(mask)
-                else:
-                    mask = torch.zeros((64,64), dtype=torch.float32, device="cpu")
-                output_images.append(image)
-                output_masks.append(mask.unsqueeze(0))
+            dir_files = folder_files[index:index + Image_Load_Count]
+        else:
+            dir_files = folder_files[index:]
 
-            if len(output_images) > 1 and img.format not in excluded_formats:
-                output_image = torch.cat(output_images, dim=0)
-                output_mask = torch.cat(output_masks, dim=0)
-            else:
-                output_image = output_images[0]
-                output_mask = output_masks[0]
+        image_path_list = [folder_paths.get_annotated_filepath(image_path) for image_path in dir_files]
 
-            images.append(output_image)
-            masks.append(output_mask)
-            image_path_list.append(input_filepath)
-            image_count += 1
+        # Decode every selected file in parallel, optionally decoding the next files in the background
+        if Prefetch_Depth > 0:
+            next_index = index + len(image_path_list)
+            upcoming = [folder_paths.get_annotated_filepath(image_path) for image_path in folder_files[next_index:next_index + Prefetch_Depth]]
+            decoded_images = self.prefetcher.decode(image_path_list, upcoming)
+        else:
+            self.prefetcher.clear()
+            decoded_images = decode_image_files(image_path_list)
 
-        if len(images) == 1:
+        if len(image_path_list) == 1:
+            image, mask = decoded_to_tensors(decoded_images[0], Output_Dtype, Generate_Mask)
             input_filenamepath = image_path_list[0]
             input_filename = os.path.basename(input_filenamepath)
             input_filename_no_ext = os.path.splitext(input_filename)[0]
-            return (images[0], masks[0], 1, Input_Folder, input_filenamepath, input_filename, input_filename_no_ext)
-
-        elif len(images) > 1:
-            image1 = images[0]
-            mask1 = masks[0]
-            for image2 in images[1:]:
-                if image1.shape[1:] != image2.shape[1:]:
-                    image2 = common_upscale(image2.movedim(-1, 1), image1.shape[2], image1.shape[1], "bilinear", "center").movedim(1, -1)
-                image1 = torch.cat((image1, image2), dim=0)
-
-            for mask2 in masks[1:]:
-                if mask1.shape != mask2.shape:
-                    mask2 = torch.nn.functional.interpolate(mask2.unsqueeze(0).unsqueeze(0), size=(mask1.shape[-2], mask1.shape[-1]), mode='bilinear', align_corners=False)
-                    mask2 = mask2.squeeze(0)
-                mask1 = torch.cat((mask1, mask2), dim=0)
+            return (image, mask, 1, Input_Folder, input_filenamepath, input_filename, input_filename_no_ext)
+
+        elif len(image_path_list) > 1:
+            # Write every decoded file into one preallocated batch
+            image1, mask1 = build_image_batch(decoded_images, Output_Dtype, Generate_Mask)
 
             input_filenamepath = image_path_list[0]
             input_filename = os.path.basename(input_filenamepath)
             input_filename_no_ext = os.path.splitext(input_filename)[0]
 
-            previous_input_filename = read_from_file('sozeimagebatchcache.txt')
-            write_to_file('sozeimagebatchcache.txt', input_filename)
+            previous_input_filename = STATE.swap(node_namespace(unique_id, "Soze_LoadImagesFromFolder"), "previous_filename", input_filename)
 
-            return (image1, mask1, len(images), Input_Folder, input_filenamepath, input_filename, input_filename_no_ext, previous_input_filename != input_filename)
+            return (image1, mask1, len(image_path_list), Input_Folder, input_filenamepath, input_filename, input_filename_no_ext, previous_input_filename != input_filename)
 
     @classmethod
     def IS_CHANGED(cls, *args, **kwargs):
@@ -282,6 +208,10 @@ class Soze_LoadImageFromFilepath:
                 "Image_Filepath": ("STRING", {"default": ""}),
                 "Return_None_If_Not_Found": ("BOOLEAN", {"default": False, "tooltip": "If enabled, will return empty outputs instead of erroring if the file is not found."}),
             },
+            "optional": {
+                "Output_Dtype": (OUTPUT_DTYPES, {"default": "float32", "tooltip": "float16/uint8 keep the loaded pixels 2x/4x smaller in memory. Most nodes expect float32, convert with Image To Float (Soze) before using them."}),
+                "Generate_Mask": ("BOOLEAN", {"default": True, "tooltip": "Build the mask from the alpha channel. Disable when nothing uses the mask to skip the work, an empty 64x64 mask is returned instead."}),
+            },
         }
 
     RETURN_TYPES = ("IMAGE", "MASK", "STRING", "STRING", "STRING", "STRING", "BOOL")
@@ -290,7 +220,7 @@ class Soze_LoadImageFromFilepath:
 
     CATEGORY = "image"
     
-    def load_image_from_filepath(self, Image_Filepath, Return_None_If_Not_Found=False):
+    def load_image_from_filepath(self, Image_Filepath, Return_None_If_Not_Found=False, Output_Dtype="float32", Generate_Mask=True):
         if not os.path.isfile(Image_Filepath) and not os.path.exists(Image_Filepath):
             if Return_None_If_Not_Found:
                 return (None, None, "", "", "", "", False)
@@ -300,42 +230,7 @@ class Soze_LoadImageFromFilepath:
         input_filename = os.path.basename(input_filepath)
         input_filename_no_ext = os.path.splitext(input_filename)[0]
 
-        img = node_helpers.pillow(Image.open, input_filepath)
-        
-        output_images = []
-        output_masks = []
-        w, h = None, None
-
-        excluded_formats = ['MPO']
-        for i in ImageSequence.Iterator(img):
-            i = node_helpers.pillow(ImageOps.exif_transpose, i)
-            if i.mode == 'I':
-                i = i.point(lambda i: i * (1 / 255))
-            image = i.convert("RGB")
-
-            if len(output_images) == 0:
-                w = image.size[0]
-                h = image.size[1]
-
-            if image.size[0] != w or image.size[1] != h:
-                continue
-
-            image = np.array(image).astype(np.float32) / 255.0
-            image = torch.from_numpy(image)[None,]
-            if 'A' in i.getbands():
-                mask = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                mask = 1. - torch.from_numpy(mask)
-            else:
-                mask = torch.zeros((64,64), dtype=torch.float32, device="cpu")
-            output_images.append(image)
-            output_masks.append(mask.unsqueeze(0))
-
-        if len(output_images) > 1 and img.format not in excluded_formats:
-            output_image = torch.cat(output_images, dim=0)
-            output_mask = torch.cat(output_masks, dim=0)
-        else:
-            output_image = output_images[0]
-            output_mask = output_masks[0]
+        output_image, output_mask = load_image_file(input_filepath, Output_Dtype, Generate_Mask)
 
         return (output_image, output_mask, os.path.dirname(input_filepath), input_filepath, input_filename, input_filename_no_ext, False)
 
@@ -343,6 +238,9 @@ class Soze_LoadImageFromFilepath:
     
     
 class Soze_LoadImagesFromFolderXLora:
+    def __init__(self):
+        self.prefetcher = ImagePrefetcher()
+
     @classmethod
     def INPUT_TYPES(s):
         return {
@@ -353,6 +251,12 @@ class Soze_LoadImagesFromFolderXLora:
             },
             "optional": {
                 "index": ("INT", {"default": 0, "min": 0, "max": 1000000, "control_after_generate": True, "step": 1}),
+                "Prefetch_Depth": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1, "tooltip": "Number of upcoming images to decode in the background for the next run. 0 disables prefetching."}),
+                "Output_Dtype": (OUTPUT_DTYPES, {"default": "float32", "tooltip": "float16/uint8 keep the loaded pixels 2x/4x smaller in memory. Most nodes expect float32, convert with Image To Float (Soze) before using them."}),
+                "Generate_Mask": ("BOOLEAN", {"default": True, "tooltip": "Build the mask from the alpha channel. Disable when nothing uses the mask to skip the work, an empty 64x64 mask is returned instead."}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
@@ -362,19 +266,14 @@ class Soze_LoadImagesFromFolderXLora:
 
     CATEGORY = "image"
 
-    def load_images(self, Input_Folder, index, start_lora_name, lora_count):
+    def load_images(self, Input_Folder, index, start_lora_name, lora_count, Prefetch_Depth=0, Output_Dtype="float32", Generate_Mask=True, unique_id=None):
         if not os.path.isdir(Input_Folder):
             raise FileNotFoundError(f"Folder not found: {Input_Folder}")
-        dir_files = os.listdir(Input_Folder)
-        if len(dir_files) == 0:
-            raise FileNotFoundError(f"Folder only has {len(dir_files)} files in it: {Input_Folder}")
 
-        # Filter files by extension
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.webp']
-        dir_files = [f for f in dir_files if any(f.lower().endswith(ext) for ext in valid_extensions)]
-
-        dir_files = sorted(dir_files)
-        dir_files = [os.path.join(Input_Folder, x) for x in dir_files]
+        # Filtered, sorted listing is cached until the folder changes
+        dir_files = list_folder_files(Input_Folder, IMAGE_EXTENSIONS)
+        if len(dir_files) == 0:
+            raise FileNotFoundError(f"Folder only has {len(dir_files)} images in it: {Input_Folder}")
 
         images = []
         masks = []
@@ -401,55 +300,23 @@ class Soze_LoadImagesFromFolderXLora:
             raise ValueError(f"Index {index} has completed the iteration of rows {num_images} against each lora indicated {lora_count}.")
 
         image_path = dir_files[image_idx]
-        if os.path.isdir(image_path):
-            raise ValueError(f"Image path is a directory: {image_path}")
 
         input_filepath = folder_paths.get_annotated_filepath(image_path)
         input_filename = os.path.basename(input_filepath)
         input_filename_no_ext = os.path.splitext(input_filename)[0]
 
-        img = node_helpers.pillow(Image.open, input_filepath)
-
-        output_images = []
-        output_masks = []
-        w, h = None, None
-
-        for i in ImageSequence.Iterator(img):
-            i = node_helpers.pillow(ImageOps.exif_transpose, i)
-
-            if i.mode == 'I':
-                i = i.point(lambda i: i * (1 / 255))
-            image = i.convert("RGB")
-
-            if len(output_images) == 0:
-                w = image.size[0]
-                h = image.size[1]
-
-            if image.size[0] != w or image.size[1] != h:
-                continue
-
-            image = np.array(image).astype(np.float32) / 255.0
-            image = torch.from_numpy(image)[None,]
-            if 'A' in i.getbands():
-                mask = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                mask = 1. - torch.from_numpy(mask)
-            else:
-                mask = torch.zeros((64,64), dtype=torch.float32, device="cpu")
-            output_images.append(image)
-            output_masks.append(mask.unsqueeze(0))
-
-        if len(output_images) > 1 and img.format not in excluded_formats:
-            output_image = torch.cat(output_images, dim=0)
-            output_mask = torch.cat(output_masks, dim=0)
+        # The index wraps around the folder once per lora, so the upcoming images wrap too
+        if Prefetch_Depth > 0:
+            upcoming = [folder_paths.get_annotated_filepath(dir_files[(image_idx + offset) % num_images]) for offset in range(1, min(Prefetch_Depth, num_images - 1) + 1)]
+            output_image, output_mask = decoded_to_tensors(self.prefetcher.decode([input_filepath], upcoming)[0], Output_Dtype, Generate_Mask)
         else:
-            output_image = output_images[0]
-            output_mask = output_masks[0]
+            self.prefetcher.clear()
+            output_image, output_mask = load_image_file(input_filepath, Output_Dtype, Generate_Mask)
 
         lora_full_path = folder_paths.get_full_path_or_raise("loras", lora_list[lora_index])
         lora_name_only = os.path.basename(lora_list[lora_index])
 
-        previous_input_filename = read_from_file('sozeimagebatchcache.txt')
-        write_to_file('sozeimagebatchcache.txt', input_filename)
+        STATE.set(node_namespace(unique_id, "Soze_LoadImagesFromFolderXLora"), "previous_filename", input_filename)
 
         return (
             output_image,
@@ -560,6 +427,57 @@ class Soze_LoadImageFromUrl:
 
 # Node from abandoned repo https://github.com/M1kep/Comfy_KepListStuff 
 
+LABEL_TEXT_COLOR = (1.0, 0.0, 0.0)
+LABEL_BOX_COLOR = (1.0, 1.0, 0.2)
+
+
+@functools.lru_cache(maxsize=256)
+def render_label_mask(text: str, font_size: int) -> Tensor:
+    """
+    Draws text as a uint8 (H, W) coverage mask. Cached, so each label is only drawn once while it is
+    in use, color is applied when blending. Do not modify the result.
+    """
+    font = get_font(font_size)
+    left, top, right, bottom = font.getbbox(text)
+    # Drawn into a grayscale mask so antialiased edges blend cleanly
+    coverage_img = Image.new('L', (max(right, 1), max(bottom, 1)), 0)
+    ImageDraw.Draw(coverage_img).text((0, 0), text, fill=255, font=font)
+    return torch.from_numpy(np.array(coverage_img, dtype=np.uint8))
+
+
+def blend_labels(images: Tensor, masks: List[Tensor], x: int, y: int, box: Optional[Tuple[int, int]] = None):
+    """
+    Alpha blends red label masks into images (N, H, W, C) in place at (x, y), clipped to the image,
+    optionally over a yellow box spanning (0, 0)-box. One mask is applied to the whole batch,
+    otherwise there is one mask per image.
+    """
+    height = max(mask.shape[0] for mask in masks)
+    width = max(mask.shape[1] for mask in masks)
+    if box is not None:
+        height, width = max(height, box[1] + 1), max(width, box[0] + 1)
+    coverage = torch.zeros((len(masks), height, width, 1), dtype=torch.uint8)
+    for idx, mask in enumerate(masks):
+        coverage[idx, :mask.shape[0], :mask.shape[1], 0] = mask
+
+    src_x, src_y = max(0, -x), max(0, -y)
+    x, y = max(0, x), max(0, y)
+    h = min(height - src_y, images.shape[1] - y)
+    w = min(width - src_x, images.shape[2] - x)
+    if h <= 0 or w <= 0:
+        return
+    alpha = coverage[:, src_y:src_y + h, src_x:src_x + w].to(images.device, images.dtype) / 255.
+    color = alpha * torch.tensor(LABEL_TEXT_COLOR, dtype=images.dtype, device=images.device)
+    if box is not None:
+        box_alpha = torch.zeros((1, h, w, 1), dtype=images.dtype, device=images.device)
+        box_alpha[:, :max(0, box[1] + 1 - src_y), :max(0, box[0] + 1 - src_x)] = 1.
+        box_alpha = (1. - alpha) * box_alpha
+        color += box_alpha * torch.tensor(LABEL_BOX_COLOR, dtype=images.dtype, device=images.device)
+        alpha = alpha + box_alpha
+
+    region = images[:, y:y + h, x:x + w, :3]
+    region.mul_(1. - alpha).add_(color)
+
+
 class Soze_ImageLabelOverlay:
     def __init__(self) -> None:
         pass
@@ -586,6 +504,10 @@ class Soze_ImageLabelOverlay:
 
     CATEGORY = "image"
 
+    FONT_SIZE = 60
+    # Yellow background drawn behind value labels, in pixels (inclusive like PIL's rectangle)
+    LABEL_BOX = (512, 60)
+
     def process(
             self,
             images: List[Tensor],
@@ -611,30 +533,25 @@ class Soze_ImageLabelOverlay:
 
         image_h, _, _ = batches[0][0].size()
 
-        font = ImageFont.truetype(fm.findfont(fm.FontProperties()), 60)
-
         ret_images: List[Tensor]= []
         loop_gen = zip_with_fill(batches, float_labels, int_labels, str_labels)
         for b_idx, (img_batch, float_lbl, int_lbl, str_lbl) in enumerate(loop_gen):
-            batch: List[Tensor] = []
-            for i_idx, img in enumerate(img_batch):
-                pil_img = tensor2pil(img)
-                # print(f"Batch: {b_idx} | img: {i_idx}")
-                # print(img.size())
-                draw = ImageDraw.Draw(pil_img)
-
-                draw.text((0, image_h - 60), f"B: {b_idx} | I: {i_idx}", fill="red", font=font)
-
-                y_offset = 0
-                for _, lbl in zip(["float", "int", "str"], [float_lbl, int_lbl, str_lbl]):
-                    if lbl is None:
-                        continue
-                    draw.rectangle((0, 0 + y_offset, 512, 60 + y_offset), fill="#ffff33")
-                    draw.text((0, 0 + y_offset), str(lbl), fill="red", font=font)
-                    y_offset += 60
-                batch.append(pil2tensor(pil_img))
-
-            ret_images.append(torch.cat(batch))
+            batch = to_float_image(img_batch)
+            batch = batch.clone() if batch.data_ptr() == img_batch.data_ptr() else batch
+
+            # Index text differs per image, so its masks are stacked and blended in one step
+            masks = [render_label_mask(f"B: {b_idx} | I: {i_idx}", self.FONT_SIZE) for i_idx in range(len(batch))]
+            blend_labels(batch, masks, 0, image_h - self.FONT_SIZE)
+
+            # Value labels are the same for the whole batch and are blended into every image at once
+            y_offset = 0
+            for lbl in [float_lbl, int_lbl, str_lbl]:
+                if lbl is None:
+                    continue
+                blend_labels(batch, [render_label_mask(str(lbl), self.FONT_SIZE)], 0, y_offset, self.LABEL_BOX)
+                y_offset += self.FONT_SIZE
+
+            ret_images.append(batch)
 
         return (ret_images,)
 
@@ -648,6 +565,69 @@ class AnyType(str):
 # Our any instance wants to be a wildcard string
 ANY = AnyType("*")
 
+
+def paste_tensor(canvas: Tensor, source: Tensor, x: int, y: int, width: Optional[int] = None, height: Optional[int] = None):
+    """
+    Copies an (H, W, C) tensor into canvas at (x, y), clipped to the canvas like PIL's paste and,
+    when given, to the width x height cell at (x, y). uint8 sources are scaled to [0, 1].
+    """
+    x, y = int(x), int(y)
+    canvas_h, canvas_w = canvas.shape[0], canvas.shape[1]
+    src_x, src_y = max(0, -x), max(0, -y)
+    x, y = max(0, x), max(0, y)
+    h = min(source.shape[0] - src_y, canvas_h - y)
+    w = min(source.shape[1] - src_x, canvas_w - x)
+    if height is not None:
+        h = min(h, height - src_y)
+    if width is not None:
+        w = min(w, width - src_x)
+    if h <= 0 or w <= 0:
+        return
+    region = source[src_y:src_y + h, src_x:src_x + w]
+    if region.dtype == torch.uint8:
+        region = region.to(canvas.device, canvas.dtype) / 255.
+    canvas[y:y + h, x:x + w] = region
+
+
+# Rendered strips are kept as uint8 up to this many bytes in total
+MAX_LABEL_STRIP_BYTES = 64 * 1024 * 1024
+
+_label_strips: "OrderedDict[tuple, Tensor]" = OrderedDict()
+_label_strips_bytes = 0
+_label_strips_lock = threading.Lock()
+
+
+def render_label_strip(text: str, width: int, height: int, text_x: int, font_size: int, color: str, rotate: bool = False) -> Tensor:
+    """
+    Renders a label on a white uint8 (height, width, 3) strip, rotated 90 degrees if requested.
+    Cached, so each unique label is only drawn once. The returned tensor is shared, do not modify it.
+    """
+    global _label_strips_bytes
+    key = (text, width, height, text_x, font_size, color, rotate)
+    with _label_strips_lock:
+        strip = _label_strips.get(key)
+        if strip is not None:
+            _label_strips.move_to_end(key)
+            return strip
+
+    font = get_font(font_size)
+    img_txt = Image.new('RGB', (width, height), "#ffffff")
+    draw_txt = ImageDraw.Draw(img_txt)
+    draw_txt.text((text_x, 0), text, anchor='ma', fill=color, font=font)
+    if rotate:
+        img_txt = img_txt.rotate(90, expand=True)
+    strip = torch.from_numpy(np.array(img_txt, dtype=np.uint8))
+
+    with _label_strips_lock:
+        if key not in _label_strips:
+            _label_strips[key] = strip
+            _label_strips_bytes += strip.numel()
+        _label_strips.move_to_end(key)
+        while len(_label_strips) > 1 and _label_strips_bytes > MAX_LABEL_STRIP_BYTES:
+            _, evicted = _label_strips.popitem(last=False)
+            _label_strips_bytes -= evicted.numel()
+    return strip
+
 # Node from abandoned repo https://github.com/M1kep/Comfy_KepListStuff 
 
 class Soze_XYImage:
@@ -846,74 +826,49 @@ class Soze_XYImage:
             x_label_offset += self.MAIN_LABEL_SIZE
             has_main_y_label = True
 
+        device = batches[0].device
         images = []
         for z_idx in range(num_z):
-            full_image = Image.new("RGB", (full_w, full_h))
-            full_draw = ImageDraw.Draw(full_image)
-
-            full_draw.rectangle((0, 0, full_w, full_h), fill="#ffffff")
+            # Every source image and label strip is written straight into this canvas by slice
+            full_image = torch.ones((full_h, full_w, 3), dtype=torch.float32, device=device)
 
             batch_idx = 0
             active_y_offset = 0
             active_x_offset = 0
             if has_z_labels:
-                font = ImageFont.truetype(fm.findfont(fm.FontProperties()), self.Z_LABEL_SIZE)
-                full_draw.rectangle((0, 0, full_w, self.Z_LABEL_SIZE), fill="#ffffff")
-                full_draw.text((grid_w//2 + x_label_offset, 0),  z_labels[z_idx], anchor='ma', fill=self.LABEL_COLOR, font=font)
+                strip = render_label_strip(z_labels[z_idx], full_w, self.Z_LABEL_SIZE, grid_w//2 + x_label_offset, self.Z_LABEL_SIZE, self.LABEL_COLOR)
+                paste_tensor(full_image, strip, 0, 0)
                 active_y_offset += self.Z_LABEL_SIZE
 
             if has_main_x_label:
                 assert x_main_label is not None
-                font = ImageFont.truetype(fm.findfont(fm.FontProperties()), self.MAIN_LABEL_SIZE)
-                full_draw.rectangle((0, active_y_offset, full_w, self.MAIN_LABEL_SIZE + active_y_offset), fill="#ffffff")
-                full_draw.text((grid_w//2 + x_label_offset, 0 + active_y_offset), x_main_label[0], anchor='ma', fill=self.LABEL_COLOR, font=font)
+                strip = render_label_strip(x_main_label[0], full_w, self.MAIN_LABEL_SIZE, grid_w//2 + x_label_offset, self.MAIN_LABEL_SIZE, self.LABEL_COLOR)
+                paste_tensor(full_image, strip, 0, active_y_offset)
                 active_y_offset += self.MAIN_LABEL_SIZE
 
             if has_horizontal_labels:
                 assert x_labels is not None
-                font = ImageFont.truetype(fm.findfont(fm.FontProperties()), self.LABEL_SIZE)
                 for label_idx, label in enumerate(x_labels):
                     x_offset = (batch_w * label_idx) + x_label_offset
-                    full_draw.rectangle((x_offset, 0 + active_y_offset, x_offset + batch_w, self.LABEL_SIZE + active_y_offset), fill="#ffffff")
-                    full_draw.text((x_offset + (batch_w / 2), 0 + active_y_offset), label, anchor='ma', fill=self.LABEL_COLOR, font=font)
+                    strip = render_label_strip(label, batch_w, self.LABEL_SIZE, batch_w // 2, self.LABEL_SIZE, self.LABEL_COLOR)
+                    paste_tensor(full_image, strip, x_offset, active_y_offset)
 
             if has_main_y_label:
                 assert y_main_label is not None
-                font = ImageFont.truetype(fm.findfont(fm.FontProperties()), self.MAIN_LABEL_SIZE)
-
-                img_txt = Image.new('RGB', (full_h - active_y_offset, self.MAIN_LABEL_SIZE))
-                draw_txt = ImageDraw.Draw(img_txt)
-                draw_txt.rectangle((0, 0, full_h - active_y_offset, self.MAIN_LABEL_SIZE), fill="#ffffff")
-                draw_txt.text(((full_h - active_y_offset)//2, 0),  y_main_label[0], anchor='ma', fill=self.LABEL_COLOR, font=font)
-                img_txt = img_txt.rotate(90, expand=True)
-                full_image.paste(img_txt, (active_x_offset, active_y_offset))
+                strip = render_label_strip(y_main_label[0], full_h - active_y_offset, self.MAIN_LABEL_SIZE, (full_h - active_y_offset)//2, self.MAIN_LABEL_SIZE, self.LABEL_COLOR, rotate=True)
+                paste_tensor(full_image, strip, active_x_offset, active_y_offset)
                 active_x_offset += self.MAIN_LABEL_SIZE
 
             if has_vertical_labels:
                 assert y_labels is not None
-                font = ImageFont.truetype(fm.findfont(fm.FontProperties()), self.LABEL_SIZE)
                 for label_idx, label in enumerate(y_labels):
                     y_offset = (batch_h * label_idx) + y_label_offset
-
-                    img_txt = Image.new('RGB', (batch_h, self.LABEL_SIZE))
-                    draw_txt = ImageDraw.Draw(img_txt)
-                    draw_txt.rectangle((0, 0, batch_h, self.LABEL_SIZE), fill="#ffffff")
-                    draw_txt.text((batch_h//2, 0),  label, anchor='ma', fill=self.LABEL_COLOR, font=font)
-                    img_txt = img_txt.rotate(90, expand=True)
-                    full_image.paste(img_txt, (active_x_offset, y_offset))
+                    strip = render_label_strip(label, batch_h, self.LABEL_SIZE, batch_h//2, self.LABEL_SIZE, self.LABEL_COLOR, rotate=True)
+                    paste_tensor(full_image, strip, active_x_offset, y_offset)
 
             for split_idx, split in enumerate(splits):
                 for idx_in_split in range(split):
-                    batch_img = Image.new("RGB", (batch_w, batch_h))
                     batch = batches[batch_idx + idx_in_split + images_per_z * z_idx]
-                    if batch_stack_direction == "horizontal":
-                        for img_idx, img in enumerate(batch):
-                            x_offset = image_w * img_idx
-                            batch_img.paste(tensor2pil(img), (x_offset, 0))
-                    else:
-                        for img_idx, img in enumerate(batch):
-                            y_offset = image_h * img_idx
-                            batch_img.paste(tensor2pil(img), (0, y_offset))
 
                     if stack_direction == "horizontal":
                         x_offset = batch_w * split_idx + x_label_offset
@@ -921,12 +876,30 @@ class Soze_XYImage:
                     else:
                         x_offset = batch_w * idx_in_split + x_label_offset
                         y_offset = batch_h * split_idx + y_label_offset
-                    full_image.paste(batch_img, (x_offset, y_offset))
+
+                    # Cells of short batches stay black like an empty batch image
+                    if len(batch) < batch_size:
+                        full_image[y_offset:y_offset + batch_h, x_offset:x_offset + batch_w] = 0.
+
+                    for img_idx, img in enumerate(batch):
+                        if batch_stack_direction == "horizontal":
+                            paste_tensor(full_image, to_float_image(img[..., :3], device).clamp(0, 1), x_offset + image_w * img_idx, y_offset, image_w, image_h)
+                        else:
+                            paste_tensor(full_image, to_float_image(img[..., :3], device).clamp(0, 1), x_offset, y_offset + image_h * img_idx, image_w, image_h)
 
                 batch_idx += split
-            images.append(pil2tensor(full_image))
+            images.append(full_image.unsqueeze(0))
         return (images,)
 
+def solid_color_images(colors: Tensor, width: int, height: int, expand: bool = False) -> Tensor:
+    """
+    Builds a (N, height, width, 3) batch where image i is filled with colors[i] (float RGB in [0, 1]).
+    With expand the result is a broadcast view of the colors that allocates no pixel memory.
+    """
+    images = colors.view(-1, 1, 1, 3).expand(colors.shape[0], height, width, 3)
+    return images if expand else images.contiguous()
+
+
 # Node from abandoned repo https://github.com/M1kep/Comfy_KepListStuff 
 
 class Soze_VariableImageBuilder:
@@ -945,6 +918,9 @@ class Soze_VariableImageBuilder:
                 "height": ("INT", {"defaultInput": False, "default": 512}),
                 "batch_size": ("INT", {"default": 1, "min": 1}),
             },
+            "optional": {
+                "expand_views": (["False", "True"], {"default": "False", "tooltip": "Return broadcast views of one pixel per image instead of materialised images. Near zero time and memory, but downstream nodes must not write to them in place."}),
+            },
         }
 
     RELOAD_INST = True
@@ -964,12 +940,11 @@ class Soze_VariableImageBuilder:
             width: int,
             height: int,
             batch_size: int,
+            expand_views: str = "False",
     ) -> Tuple[Tensor]:
-        batch_tensors: List[Tensor] = []
-        for _ in range(batch_size):
-            image = Image.new("RGB", (width, height), color=(r, g, b, a))
-            batch_tensors.append(pil2tensor(image))
-        return (torch.cat(batch_tensors),)
+        # Images are RGB, so alpha is accepted but not used
+        color = torch.tensor([[r, g, b]], dtype=torch.float32) / 255.0
+        return (solid_color_images(color.expand(batch_size, 3), width, height, expand_views == "True"),)
 
 # Node from abandoned repo https://github.com/M1kep/Comfy_KepListStuff 
 
@@ -985,6 +960,9 @@ class Soze_EmptyImages:
                 "num_images": ("INT", {"forceInput": True, "min": 1}),
                 "splits": ("INT", {"forceInput": True, "min": 1}),
                 "batch_size": ("INT", {"default": 1, "min": 1}),
+                "width": ("INT", {"default": 512, "min": 1, "max": 16384}),
+                "height": ("INT", {"default": 512, "min": 1, "max": 16384}),
+                "expand_views": (["False", "True"], {"default": "False", "tooltip": "Return broadcast views of one pixel per image instead of materialised images. Near zero time and memory, but downstream nodes must not write to them in place."}),
             }
         }
 
@@ -1003,7 +981,15 @@ class Soze_EmptyImages:
             num_images: Optional[List[int]] = None,
             splits: Optional[List[int]] = None,
             batch_size: Optional[List[int]] = None,
+            width: Optional[List[int]] = None,
+            height: Optional[List[int]] = None,
+            expand_views: Optional[List[str]] = None,
     ) -> Tuple[List[Tensor]]:
+        # INPUT_IS_LIST wraps every input in a list, only the first value of these is used
+        width = width[0] if width else 512
+        height = height[0] if height else 512
+        expand = expand_views is not None and expand_views[0] == "True"
+
         if batch_size is None:
             batch_size = [1]
         else:
@@ -1048,16 +1034,15 @@ class Soze_EmptyImages:
             )
             print(f"Splits: {split} | Base Color: {base_color}")
 
+            # Each batch slot steps from the base color towards white
+            base = torch.tensor(base_color, dtype=torch.float64)
+            steps = torch.arange(batch_size[0], dtype=torch.float64).unsqueeze(1)
+            batch_colors = (base + torch.floor((255 - base) / batch_size[0] * steps)).to(torch.float32) / 255.0
+            batch_images = solid_color_images(batch_colors, width, height, expand)
+
             for _ in range(split):
-                batch_tensor = torch.zeros(batch_size[0], 512, 512, 3)
-                for batch_idx in range(batch_size[0]):
-                    batch_color = (
-                        (base_color[0] + int(((255 - base_color[0]) / batch_size[0]) * batch_idx)),
-                        (base_color[1] + int(((255 - base_color[1]) / batch_size[0]) * batch_idx)),
-                        (base_color[2] + int(((255 - base_color[2]) / batch_size[0]) * batch_idx)),
-                    )
-                    image = Image.new("RGB", (512, 512), color=batch_color)
-                    batch_tensor[batch_idx] = pil2tensor(image)
+                # Materialised batches are copied so every output can be modified independently
+                batch_tensor = batch_images if expand else batch_images.clone()
                 ret_images.append(batch_tensor)
         return (ret_images,)
 
@@ -1146,6 +1131,31 @@ class Soze_GetImageColors:
                         "tooltip": "Comma-separated list of colors to exclude from the output",
                     },
                 ),
+                "quantize_bits": (
+                    "INT",
+                    {
+                        "default": 8,
+                        "min": 1,
+                        "max": 8,
+                        "tooltip": "Bits kept per channel. Lower values merge similar colors, reported as the center of each bucket",
+                    },
+                ),
+                "downsample": (
+                    "INT",
+                    {
+                        "default": 1,
+                        "min": 1,
+                        "max": 64,
+                        "tooltip": "Only sample every Nth pixel in each direction",
+                    },
+                ),
+                "per_frame": (
+                    "BOOLEAN",
+                    {
+                        "default": False,
+                        "tooltip": "Report the colors of each image in the batch on its own line instead of the whole batch together",
+                    },
+                ),
             }
         }
 
@@ -1160,55 +1170,75 @@ class Soze_GetImageColors:
     FUNCTION = "main"
     CATEGORY = "image"
 
+    def parse_exclude_colors(self, exclude_colors: str) -> List[Tuple[int, int, int]]:
+        colors = []
+        for r, g, b in re.findall(r"rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)", exclude_colors, re.IGNORECASE):
+            colors.append((min(int(r), 255), min(int(g), 255), min(int(b), 255)))
+        for hex_color in re.findall(r"#([0-9a-fA-F]{6})\b", exclude_colors):
+            value = int(hex_color, 16)
+            colors.append(((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF))
+        return colors
+
+    def top_colors(self, image: torch.Tensor, num_colors: int, excluded: List[Tuple[int, int, int]], quantize_bits: int, downsample: int) -> Tuple[List[str], List[str]]:
+        # Pack each pixel into one integer key so counting is a single unique() over the image
+        shift = 8 - quantize_bits
+        pixels = image[..., ::downsample, ::downsample, :3]
+        rgb = (pixels * 255).to(torch.int32).clamp_(0, 255) >> shift
+        keys = ((rgb[..., 0] << (2 * quantize_bits)) | (rgb[..., 1] << quantize_bits) | rgb[..., 2]).flatten()
+
+        unique_keys, counts = torch.unique(keys, return_counts=True)
+
+        # Exclusion happens on the packed keys, quantized the same way as the pixels
+        if excluded:
+            excluded_keys = torch.tensor(
+                [((r >> shift) << (2 * quantize_bits)) | ((g >> shift) << quantize_bits) | (b >> shift) for r, g, b in excluded],
+                dtype=unique_keys.dtype, device=unique_keys.device)
+            keep = ~torch.isin(unique_keys, excluded_keys)
+            unique_keys, counts = unique_keys[keep], counts[keep]
+
+        order = torch.sort(counts, descending=True, stable=True).indices[:num_colors]
+        top_keys = unique_keys[order].cpu().tolist()
+
+        # Only the top colors are formatted
+        channel_mask = (1 << quantize_bits) - 1
+        offset = (1 << shift) >> 1
+        rgb_colors = []
+        hex_colors = []
+        for key in top_keys:
+            r = (((key >> (2 * quantize_bits)) & channel_mask) << shift) + offset
+            g = (((key >> quantize_bits) & channel_mask) << shift) + offset
+            b = ((key & channel_mask) << shift) + offset
+            rgb_colors.append(f"rgb({r}, {g}, {b})")
+            hex_colors.append(f"#{r:02x}{g:02x}{b:02x}")
+        return rgb_colors, hex_colors
+
     def main(
         self,
         input_image: torch.Tensor,
         num_colors: int = 5,
         exclude_colors: str = "",
+        quantize_bits: int = 8,
+        downsample: int = 1,
+        per_frame: bool = False,
     ) -> tuple[str, ...]:
-        # Process exclude colors
-        if exclude_colors.strip():
-            self.exclude = [color.strip().lower() for color in exclude_colors.strip().split(",")]
-        else:
-            self.exclude = []
-
-        # Convert image to pixels
-        pixels = input_image.view(-1, input_image.shape[-1]).numpy()
-        pixels = (pixels * 255).astype(int)  # Scale to 0-255 and convert to integers
-
-        # Create color strings and count them
-        color_counts = {}
-        for pixel in pixels:
-            if pixel.shape[0] == 3:  # RGB image
-                r, g, b = pixel
-            else:  # RGBA image
-                r, g, b, _ = pixel  # Ignore alpha channel
-            rgb_str = f"rgb({r}, {g}, {b})"
-            hex_str = f"#{r:02x}{g:02x}{b:02x}"
-            
-            # Skip if this color should be excluded
-            if hex_str.lower() in self.exclude or rgb_str.lower() in self.exclude:
-                continue
-                
-            if (rgb_str, hex_str) in color_counts:
-                color_counts[(rgb_str, hex_str)] += 1
-            else:
-                color_counts[(rgb_str, hex_str)] = 1
-
-        # Sort by frequency and take top num_colors
-        sorted_colors = sorted(color_counts.items(), key=lambda x: x[1], reverse=True)
-        top_colors = sorted_colors[:num_colors]
+        excluded = self.parse_exclude_colors(exclude_colors)
 
-        # Separate RGB and hex colors
-        rgb_colors = []
-        hex_colors = []
-        for (rgb, hex_color), _ in top_colors:
-            rgb_colors.append(rgb)
-            hex_colors.append(hex_color)
+        if not per_frame:
+            rgb_colors, hex_colors = self.top_colors(input_image, num_colors, excluded, quantize_bits, downsample)
+            return (
+                ", ".join(rgb_colors),
+                ", ".join(hex_colors)
+            )
 
+        rgb_lines = []
+        hex_lines = []
+        for frame in input_image:
+            rgb_colors, hex_colors = self.top_colors(frame, num_colors, excluded, quantize_bits, downsample)
+            rgb_lines.append(", ".join(rgb_colors))
+            hex_lines.append(", ".join(hex_colors))
         return (
-            ", ".join(rgb_colors),
-            ", ".join(hex_colors)
+            "\n".join(rgb_lines),
+            "\n".join(hex_lines)
         )
     
 
@@ -1297,11 +1327,12 @@ class Soze_ShrinkImage:
     ShrinkImage(
         image: IMAGE,
         mode: ["scale", "pixels"] = "scale",
-        resize_algorithm: ["NEAREST", "BILINEAR", "BICUBIC", "LANCZOS"] = "LANCZOS",
+        resize_algorithm: ["NEAREST", "BILINEAR", "BICUBIC", "LANCZOS", "AREA"] = "LANCZOS",
         maintain_aspect: ["True", "False"] = "True",
         scale: FLOAT = 0.5,
         width: FLOAT = 100,
-        height: FLOAT = 100
+        height: FLOAT = 100,
+        batched: ["False", "True"] = "False"
     ) -> IMAGE
 
     Shrinks the input image to the specified scale or pixel dimensions using the selected resize algorithm.
@@ -1310,38 +1341,50 @@ class Soze_ShrinkImage:
     Parameters:
     - image: The input image to be shrunk.
     - mode: The mode of shrinking, either by scale (relative to original size) or by absolute pixel dimensions.
-    - resize_algorithm: The algorithm to use for resizing the image.
+    - resize_algorithm: The algorithm to use for resizing the image. AREA averages the source pixels, which suits downscaling.
     - maintain_aspect: Whether to maintain the aspect ratio of the image when resizing.
     - scale: The scale factor to shrink the image. Ignored if mode is set to "pixels".
     - width: The target width in pixels if mode is set to "pixels".
     - height: The target height in pixels if mode is set to "pixels".
+    - batched: Resize the whole batch in one torch interpolate call on the image's device and return a single
+      IMAGE batch. LANCZOS has no torch equivalent and is still resized frame by frame with PIL.
 
     Returns:
     - The shrunk image.
     """
 
+    RESIZE_ALGORITHMS = {
+        "NEAREST": Image.NEAREST,
+        "BILINEAR": Image.BILINEAR,
+        "BICUBIC": Image.BICUBIC,
+        "LANCZOS": Image.LANCZOS,
+        "AREA": Image.BOX,
+    }
+    # torch interpolate mode and antialias flag used by the batched path
+    TORCH_MODES = {
+        "NEAREST": ("nearest-exact", False),
+        "BILINEAR": ("bilinear", True),
+        "BICUBIC": ("bicubic", True),
+        "AREA": ("area", False),
+    }
+
     def __init__(self):
         pass
 
     @classmethod
     def INPUT_TYPES(s):
-        resize_algorithms = {
-            "NEAREST": Image.NEAREST,
-            "BILINEAR": Image.BILINEAR,
-            "BICUBIC": Image.BICUBIC,
-            "LANCZOS": Image.LANCZOS
-        }
         return {
             "required": {
                 "image": ("IMAGE",),
                 "mode": (["scale", "pixels"], {"default": "scale"}),
-                "resize_algorithm": (list(resize_algorithms.keys()), {"default": "LANCZOS"}),
+                "resize_algorithm": (list(s.RESIZE_ALGORITHMS.keys()), {"default": "LANCZOS"}),
                 "maintain_aspect": (["True", "False"], {"default": "True"})
             },
             "optional": {
                 "scale": ("FLOAT", {"default": 0.5, "min": 0.01, "max": 1.0, "step": 0.01}),
                 "width": ("FLOAT", {"default": 100, "min": 2, "max": 10000, "step": 1}),
-                "height": ("FLOAT", {"default": 100, "min": 2, "max": 10000, "step": 1})
+                "height": ("FLOAT", {"default": 100, "min": 2, "max": 10000, "step": 1}),
+                "batched": (["False", "True"], {"default": "False", "tooltip": "Resize the whole batch at once with torch on the image's device and output a single IMAGE batch."}),
             }
         }
 
@@ -1350,10 +1393,13 @@ class Soze_ShrinkImage:
     CATEGORY = "image/processing"
 
     def calculate_scale(self, img, mode, maintain_aspect, scale=None, width=None, height=None):
+        img_width, img_height = img.size
+        return self.calculate_scale_for_size(img_width, img_height, mode, maintain_aspect, scale, width, height)
+
+    def calculate_scale_for_size(self, img_width, img_height, mode, maintain_aspect, scale=None, width=None, height=None):
         if mode == "scale":
             return scale
         else:
-            img_width, img_height = img.size
             if maintain_aspect == "True":
                 aspect_ratio = img_width / img_height
                 if width / height > aspect_ratio:
@@ -1370,14 +1416,27 @@ class Soze_ShrinkImage:
         new_height = max(1, round(height * scale))
         return img.resize((new_width, new_height), algorithm)
 
-    def shrink_image(self, image, mode, resize_algorithm, maintain_aspect, scale=None, width=None, height=None):
-        resize_algorithms = {
-            "NEAREST": Image.NEAREST,
-            "BILINEAR": Image.BILINEAR,
-            "BICUBIC": Image.BICUBIC,
-            "LANCZOS": Image.LANCZOS
-        }
-        algorithm = resize_algorithms[resize_algorithm]
+    def shrink_image_batched(self, image, mode, resize_algorithm, maintain_aspect, scale=None, width=None, height=None):
+        img_height, img_width = image.shape[1], image.shape[2]
+        scale = self.calculate_scale_for_size(img_width, img_height, mode, maintain_aspect, scale, width, height)
+        new_width = max(1, round(img_width * scale))
+        new_height = max(1, round(img_height * scale))
+
+        if resize_algorithm not in self.TORCH_MODES:
+            algorithm = self.RESIZE_ALGORITHMS[resize_algorithm]
+            frames = [np.asarray(self.shrink_image_with_scale(to_pil_image(img.permute(2, 0, 1)), scale, algorithm)) for img in image]
+            return (stack_frames(frames).to(image.device),)
+
+        torch_mode, antialias = self.TORCH_MODES[resize_algorithm]
+        samples = to_float_image(image).movedim(-1, 1)
+        resized = torch.nn.functional.interpolate(samples, size=(new_height, new_width), mode=torch_mode, antialias=antialias)
+        return (resized.movedim(1, -1).clamp_(0, 1),)
+
+    def shrink_image(self, image, mode, resize_algorithm, maintain_aspect, scale=None, width=None, height=None, batched="False"):
+        if batched == "True":
+            return self.shrink_image_batched(image, mode, resize_algorithm, maintain_aspect, scale, width, height)
+
+        algorithm = self.RESIZE_ALGORITHMS[resize_algorithm]
 
         output_images = []
         for img in image:
@@ -1501,6 +1560,69 @@ class Soze_MultiImageBatch:
 
 
 
+class Soze_ImageToFloat:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "image": ("IMAGE", {}),
+                "device": (["gpu", "cpu"], {"default": "gpu", "tooltip": "Where to convert. On gpu only the compact pixels are copied over before converting."}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    RETURN_NAMES = ("image",)
+
+    FUNCTION = "to_float"
+    CATEGORY = "image"
+    DESCRIPTION = "Converts images loaded with a float16 or uint8 Output_Dtype to the float32 images other nodes expect."
+
+    def to_float(self, image, device):
+        if device == "gpu":
+            target = comfy.model_management.get_torch_device()
+        else:
+            target = torch.device("cpu")
+        return (to_float_image(image, target),)
+
+
+class Soze_BenchmarkImageEncoders:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "images": ("IMAGE", {"tooltip": "Representative frames to encode, nothing is written to disk."}),
+                "compress_level": ("INT", {"default": 4, "min": 0, "max": 9}),
+                "quality": ("INT", {"default": 95, "min": 1, "max": 100}),
+            },
+            "optional": {
+                "image_formats": ("STRING", {"default": ", ".join(IMAGE_FORMATS), "tooltip": "Comma separated list of the formats to compare."}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("report",)
+
+    FUNCTION = "benchmark"
+    CATEGORY = "utils"
+    DESCRIPTION = "Times each Save Image With Absolute Filename encoder on the input frames and reports throughput and output size."
+
+    def benchmark(self, images, compress_level, quality, image_formats=None):
+        if image_formats:
+            formats = [image_format.strip().lower() for image_format in image_formats.split(",") if image_format.strip()]
+        else:
+            formats = list(IMAGE_FORMATS)
+        unknown = [image_format for image_format in formats if image_format not in IMAGE_FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown image formats: {', '.join(unknown)}")
+
+        pixels = images_to_uint8(images)
+        lines = [f"{len(pixels)} frames of {pixels.shape[2]}x{pixels.shape[1]}, compress_level {compress_level}, quality {quality}"]
+        for result in benchmark_encoders(pixels, formats, compress_level, quality):
+            lines.append(f"{result['format']}: {result['mb_per_s']:.1f} MB/s, {result['seconds'] * 1000 / len(pixels):.1f} ms/frame, {result['bytes'] / (1024 * 1024):.2f} MB, ratio {result['ratio']:.2f}")
+        report = "\n".join(lines)
+        return (report,)
+
+
 class Soze_ImageSizeWithMaximum:
     @classmethod
     def INPUT_TYPES(s):
@@ -1553,6 +1675,12 @@ class Soze_SaveImageWithAbsoluteFilename:
                 "images": ("IMAGE", {"tooltip": "The images to save."}),
                 "filename_prefix": ("STRING", {"default": "ComfyUI", "tooltip": "The prefix for the file to save. This may include formatting information such as %date:yyyy-MM-dd% or %Empty Latent Image.width% to include values from nodes."})
             },
+            "optional": {
+                "image_format": (IMAGE_FORMATS, {"default": "png", "tooltip": "png keeps the workflow metadata. webp is lossless, jpeg is lossy, npy and raw are uncompressed uint8 dumps for intermediate frames."}),
+                "compress_level": ("INT", {"default": 4, "min": 0, "max": 9, "tooltip": "png zlib level, 0-1 are the fast presets. webp encoder effort (capped at 6)."}),
+                "quality": ("INT", {"default": 95, "min": 1, "max": 100, "tooltip": "jpeg quality."}),
+                "background_save": (["False", "True"], {"default": "False", "tooltip": "Return immediately and finish writing the files in the background. Pending writes are flushed before ComfyUI exits."}),
+            },
             "hidden": {
                 "prompt": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"
             },
@@ -1566,30 +1694,31 @@ class Soze_SaveImageWithAbsoluteFilename:
     CATEGORY = "image"
     DESCRIPTION = "Saves the input images to your ComfyUI output directory."
 
-    def save_images(self, images, filename_prefix="ComfyUI", prompt=None, extra_pnginfo=None):
+    def save_images(self, images, filename_prefix="ComfyUI", prompt=None, extra_pnginfo=None, image_format="png", compress_level=None, quality=95, background_save="False"):
         if images is None:
             return()
         filename_prefix += self.prefix_append
         full_output_folder, filename, counter, subfolder, filename_prefix = folder_paths.get_save_image_path(filename_prefix, self.output_dir, images[0].shape[1], images[0].shape[0])
-        results = list()
-        for (batch_number, image) in enumerate(images):
-            i = 255. * image.cpu().numpy()
-            img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
-            metadata = None
-            if not args.disable_metadata:
-                metadata = PngInfo()
-                if prompt is not None:
-                    metadata.add_text("prompt", json.dumps(prompt))
-                if extra_pnginfo is not None:
-                    for x in extra_pnginfo:
-                        metadata.add_text(x, json.dumps(extra_pnginfo[x]))
+        counter = reserve_counter(full_output_folder, filename, counter, len(images))
 
+        # Metadata is the same for every image, so it is serialized once per call
+        metadata = None
+        if not args.disable_metadata and image_format == "png":
+            metadata = build_png_metadata(prompt, extra_pnginfo)
+        if compress_level is None:
+            compress_level = self.compress_level
+        extension = FORMAT_EXTENSIONS[image_format]
+
+        pixels = images_to_uint8(images)
+        results = list()
+        jobs = list()
+        for (batch_number, image) in enumerate(pixels):
             filename_with_batch_num = filename.replace("%batch_num%", str(batch_number))
             if len(images) == 1:
-                 file = f"{filename_with_batch_num}.png"
+                 file = f"{filename_with_batch_num}.{extension}"
             else:
-                file = f"{filename_with_batch_num}_{counter:05}_.png"
-            img.save(os.path.join(full_output_folder, file), pnginfo=metadata, compress_level=self.compress_level)
+                file = f"{filename_with_batch_num}_{counter:05}_.{extension}"
+            jobs.append((image, os.path.join(full_output_folder, file), image_format, metadata, compress_level, quality))
             results.append({
                 "filename": file,
                 "subfolder": subfolder,
@@ -1597,6 +1726,88 @@ class Soze_SaveImageWithAbsoluteFilename:
             })
             counter += 1
 
+        background = background_save == "True"
+        submit_writes(jobs, write_image, background=background)
+
+        # Previews only for files the browser can show, and not for background writes that may not exist yet
+        if background or image_format not in PREVIEW_FORMATS:
+            results = []
         return { "ui": { "images": results } }
 
 
+def resolve_cache_path(filepath: str) -> str:
+    """Places relative cache paths in the ComfyUI output directory and adds the cache extension when there is none."""
+    if not os.path.isabs(filepath):
+        filepath = os.path.join(folder_paths.get_output_directory(), filepath)
+    if not os.path.splitext(filepath)[1]:
+        filepath += TENSOR_CACHE_EXTENSION
+    return filepath
+
+
+class Soze_SaveImageCache:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "images": ("IMAGE", {"tooltip": "The images to cache."}),
+                "filepath": ("STRING", {"default": "", "tooltip": f"Cache file to write. Relative paths are placed in the ComfyUI output directory and {TENSOR_CACHE_EXTENSION} is added when there is no extension."}),
+            },
+            "optional": {
+                "storage_dtype": (TENSOR_CACHE_DTYPES, {"default": "uint8", "tooltip": "uint8 matches the precision of a png, float16 keeps more detail at 2x the size, float32 stores the images exactly."}),
+            },
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("filepath",)
+    FUNCTION = "save_cache"
+
+    OUTPUT_NODE = True
+
+    CATEGORY = "image"
+    DESCRIPTION = "Saves the images uncompressed as a memory-mappable cache file that Load Image Cache (Soze) reads back without decoding."
+
+    def save_cache(self, images, filepath, storage_dtype="uint8"):
+        if not filepath:
+            raise ValueError("A cache filepath is required")
+        return (write_tensor_cache(images, resolve_cache_path(filepath), storage_dtype),)
+
+
+class Soze_LoadImageCache:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "Cache_Filepath": ("STRING", {"default": "", "tooltip": "Resolved like Save Image Cache: relative paths are in the ComfyUI output directory."}),
+            },
+            "optional": {
+                "Output_Dtype": (["as_saved"] + OUTPUT_DTYPES, {"default": "float32", "tooltip": "as_saved, or the dtype the cache was saved with, maps the file without copying it. Most nodes expect float32."}),
+            },
+        }
+
+    RETURN_TYPES = ("IMAGE", "INT")
+    RETURN_NAMES = ("Image", "Image_Count")
+    FUNCTION = "load_cache"
+
+    CATEGORY = "image"
+    DESCRIPTION = "Loads images saved by Save Image Cache (Soze), memory-mapping the file instead of decoding it."
+
+    @classmethod
+    def IS_CHANGED(s, Cache_Filepath, Output_Dtype="float32"):
+        try:
+            st = os.stat(resolve_cache_path(Cache_Filepath))
+        except OSError:
+            return float("NaN")
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def load_cache(self, Cache_Filepath, Output_Dtype="float32"):
+        if not Cache_Filepath:
+            raise ValueError("A cache filepath is required")
+        cache_path = resolve_cache_path(Cache_Filepath)
+        if not os.path.isfile(cache_path):
+            raise FileNotFoundError(f"File not found: {cache_path}")
+        image = read_tensor_cache(cache_path)
+        if Output_Dtype != "as_saved":
+            image = convert_image_dtype(image, Output_Dtype)
+        return (image, image.shape[0])
+
+
@@ -0,0 +1,111 @@
+#Cached (row, model) schedules for the CSV X Checkpoint / X Lora sweeps.
+#The model list is resolved once per plan instead of on every execution, each index maps to its
+#row and model arithmetically, and the time between steps is tracked to estimate the time left.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import folder_paths
+
+ITERATION_ORDERS = ["model_major", "row_major"]
+MAX_CACHED_PLANS = 32
+# Weight of the newest step in the moving average of the step time
+ETA_SMOOTHING = 0.2
+
+
+class IterationPlan:
+    """
+    Every (row, model) pair of a sweep in execution order.
+    model_major runs all rows against one model before moving to the next, so each model is loaded once.
+    row_major runs every model against one row before moving to the next row.
+    """
+
+    def __init__(self, folder_name: str, start_name: str, model_count: int, row_count: int, order: str):
+        model_list = folder_paths.get_filename_list(folder_name)
+        try:
+            self.start_index = model_list.index(start_name)
+        except ValueError:
+            raise ValueError(f"'{start_name}' not found in {folder_name} list.")
+        self.folder_name = folder_name
+        self.list_length = len(model_list)
+        self.requested_models = model_count
+        self.models = tuple(model_list[self.start_index:self.start_index + model_count])
+        self.row_count = row_count
+        self.order = order
+        self.total = row_count * len(self.models)
+
+        self._lock = threading.Lock()
+        self._last_index: Optional[int] = None
+        self._last_time: Optional[float] = None
+        self._step_seconds: Optional[float] = None
+
+    def step(self, index: int) -> Tuple[int, int]:
+        """Returns (row, position in models) for index, which must be below total."""
+        if self.order == "row_major":
+            return index // len(self.models), index % len(self.models)
+        return index % self.row_count, index // self.row_count
+
+    def model_full_path(self, model_position: int) -> str:
+        return folder_paths.get_full_path_or_raise(self.folder_name, self.models[model_position])
+
+    def remaining(self, index: int) -> int:
+        return max(0, self.total - index - 1)
+
+    def record_step(self, index: int) -> Optional[float]:
+        """Records that index ran now and returns the estimated seconds left, None until it can be estimated."""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_index is not None and index > self._last_index:
+                seconds = (now - self._last_time) / (index - self._last_index)
+                if self._step_seconds is None:
+                    self._step_seconds = seconds
+                else:
+                    self._step_seconds += ETA_SMOOTHING * (seconds - self._step_seconds)
+            self._last_index = index
+            self._last_time = now
+            if self._step_seconds is None:
+                return None
+            return self._step_seconds * self.remaining(index)
+
+
+_plans: "OrderedDict[tuple, IterationPlan]" = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def get_iteration_plan(folder_name: str, start_name: str, model_count: int, row_count: int, order: str = "model_major", index: int = 0) -> IterationPlan:
+    """
+    Returns the cached plan for the sweep, building it on first use.
+    The model list is read again when a sweep restarts at index 0.
+    """
+    key = (folder_name, start_name, model_count, row_count, order)
+    with _plans_lock:
+        plan = _plans.get(key)
+        if plan is not None:
+            _plans.move_to_end(key)
+
+    if plan is not None and index > 0:
+        return plan
+
+    plan = IterationPlan(folder_name, start_name, model_count, row_count, order)
+    with _plans_lock:
+        _plans[key] = plan
+        _plans.move_to_end(key)
+        while len(_plans) > MAX_CACHED_PLANS:
+            _plans.popitem(last=False)
+    return plan
+
+
+def clear_iteration_plans():
+    with _plans_lock:
+        _plans.clear()
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "unknown"
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
@@ -3,7 +3,6 @@ import folder_paths
 import os
 from pathlib import Path
 import random
-import ast
 from typing import Union, Tuple
 import time
 
@@ -19,9 +18,16 @@ import numpy as np
 
 import html
 
+from .folder_index import list_folder_files
+from .image_decode import OUTPUT_DTYPES, stack_frames
+from .json_cache import parse_json_text, strip_json_fence
+from .json_path import compile_path, evaluate_paths
+
 JSON_OUT_PATH = os.path.join(folder_paths.output_directory, "json")
 Path(JSON_OUT_PATH).mkdir(parents=True, exist_ok=True)
 
+JSON_PATH_TOOLTIP = "Dot path such as items.0.name or items[0].name. $ anchors at the root, * or [*] matches every item, [1:3] slices, [?price<10] filters. Paths with *, slices or filters return a list of matches."
+
 @PromptServer.instance.routes.get("/toolbox/json/{filename}")
 async def toolbox_json(request):
     filename = request.match_info["filename"]
@@ -60,18 +66,9 @@ class Soze_FormatJson:
     CATEGORY = "utils"
     def format_json(self, json_string: str) -> str:
         try:
-            # Try to parse the JSON as-is first
-            try:
-                if (json_string.strip().startswith("```json")):
-                    json_string = json_string.replace("```json", "").replace("```", "").strip()
-                data = json.loads(json_string)
-            except json.JSONDecodeError:
-                # Fallback to ast.literal_eval for Python-style dicts
-                try:
-                    data = ast.literal_eval(json_string)
-                except Exception:
-                    raise json.JSONDecodeError("Invalid JSON or Python literal", json_string, 0)
-            
+            # JSON first, Python-style dicts through ast.literal_eval
+            data = parse_json_text(json_string)
+
             formatted_json = json.dumps(data, indent=2)
             minified_json = json.dumps(data, separators=(',', ':'))
             return (formatted_json, minified_json,)
@@ -93,7 +90,7 @@ class Soze_ParseValueFromJSONString(Soze_FormatJson):
         return {
             "required": {
                 "json_string": ("STRING", {"forceInput": True}),
-                "key": ("STRING", {"default": ""}),
+                "key": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP + " A top level array is unwrapped to its first item unless the path starts with $."}),
             },
             "optional": {
                 "string_value_word_limit": ("INT", {"default": 0, "min": 0, "max": 10000, "tooltip": "Limit the number of words in the returned string value. 0 means no limit."}),
@@ -141,10 +138,9 @@ class Soze_ParseValueFromJSONString(Soze_FormatJson):
                 else:
                     input_preview = json_string
 
+            json_string = strip_json_fence(json_string)
             try:
-                if (json_string.strip().startswith("```json")):
-                    json_string = json_string.replace("```json", "").replace("```", "").strip()
-                data = json.loads(json_string)
+                data = parse_json_text(json_string, allow_literal_eval=False)
             except json.JSONDecodeError:
                 if use_default_on_error:
                     return get_default_tuple()
@@ -152,29 +148,21 @@ class Soze_ParseValueFromJSONString(Soze_FormatJson):
                     raise ValueError("Invalid JSON string\n\n" + json_string)
 
             minified_json = json.dumps(data, separators=(',', ':'))
+            path = compile_path(key)
             value = data
-            # Unwrap arrays by taking the first item
-            if isinstance(value, list) and len(value) > 0:
+            # Unwrap arrays by taking the first item, unless the path is anchored at the root
+            if not path.rooted and isinstance(value, list) and len(value) > 0:
                 value = value[0]
 
-            for k in key.split('.'):
-                k = k.strip()
-                if isinstance(value, dict) and k in value:
-                    value = value[k]
-                elif isinstance(value, list) and k.isdigit():
-                    idx = int(k)
-                    if 0 <= idx < len(value):
-                        value = value[idx]
-                    else:
-                        if use_default_on_error:
-                            return get_default_tuple()
-                        else:
-                            raise ValueError(f"Index '{k}' out of range in JSON\n\n" + json_string)
+            try:
+                if not path.steps and not path.rooted:
+                    raise KeyError(f"Key '{key.strip()}' not found")
+                value = path.get(value)
+            except LookupError as e:
+                if use_default_on_error:
+                    return get_default_tuple()
                 else:
-                    if use_default_on_error:
-                        return get_default_tuple()
-                    else:
-                        raise ValueError(f"Key '{k}' not found in JSON\n\n" + json_string)
+                    raise ValueError(f"{e.args[0]} in JSON\n\n" + json_string)
 
             # Truncate the extracted value (not the whole JSON) when requested
             value_str = json.dumps(value, separators=(',', ':')) if isinstance(value, (dict, list)) else str(value)
@@ -235,7 +223,7 @@ class Soze_JSONGetArrayCount:
         return {
             "required": {
                 "json_input": ("STRING", {"multiline": True}),
-                "json_path": ("STRING", {"default": ""}),
+                "json_path": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
             },
         }
 
@@ -253,30 +241,11 @@ class Soze_JSONGetArrayCount:
 
     def calculate_array_count(self, json_input: str, json_path: str) -> Tuple[str, str]:
         try:
-            # Try JSON first (standard). If it fails, try ast.literal_eval
-            try:
-                if (json_input.strip().startswith("```json")):
-                    json_input = json_input.replace("```json", "").replace("```", "").strip()
-                data = json.loads(json_input)
-            except json.JSONDecodeError:
-                # Allow Python-style single-quoted lists/dicts by using ast.literal_eval
-                try:
-                    data = ast.literal_eval(json_input)
-                except Exception:
-                    raise json.JSONDecodeError("Invalid JSON or Python literal", json_input, 0)
+            # Try JSON first (standard), Python-style single-quoted lists/dicts through ast.literal_eval
+            data = parse_json_text(json_input)
             # Navigate to the specified path if provided
             if json_path.strip() != "":
-                for key in json_path.split('.'):
-                    if key.isdigit():
-                        if isinstance(data, list):
-                            data = data[int(key)]
-                        else:
-                            data = data[key]
-                    elif '[' in key and ']' in key:
-                        list_key, idx = key[:-1].split('[')
-                        data = data[list_key][int(idx)]
-                    else:
-                        data = data[key]
+                data = compile_path(json_path).get(data)
             
             if not isinstance(data, list):
                 raise ValueError("The specified path does not lead to a JSON array")
@@ -316,17 +285,8 @@ class Soze_JSONArrayIteratorNode:
 
     def iterate_json_array(self, json_input: str, index: int) -> Tuple[str, int, int]:
         try:
-            # Try JSON first (standard). If it fails, try ast.literal_eval
-            try:
-                if (json_input.strip().startswith("```json")):
-                    json_input = json_input.replace("```json", "").replace("```", "").strip()
-                data = json.loads(json_input)
-            except json.JSONDecodeError:
-                # Allow Python-style single-quoted lists/dicts by using ast.literal_eval
-                try:
-                    data = ast.literal_eval(json_input)
-                except Exception:
-                    raise json.JSONDecodeError("Invalid JSON or Python literal", json_input, 0)
+            # Try JSON first (standard), Python-style single-quoted lists/dicts through ast.literal_eval
+            data = parse_json_text(json_input)
             if not isinstance(data, list):
                 raise ValueError("Input must be a JSON array")
 
@@ -356,16 +316,16 @@ class Soze_JSONPathExtractorNode:
         return {
             "required": {
                 "json_string": ("STRING", {"multiline": True}),
-                "path1": ("STRING", {"default": ""}),
-                "path2": ("STRING", {"default": ""}),
-                "path3": ("STRING", {"default": ""}),
-                "path4": ("STRING", {"default": ""}),
-                "path5": ("STRING", {"default": ""}),
-                "path6": ("STRING", {"default": ""}),
-                "path7": ("STRING", {"default": ""}),
-                "path8": ("STRING", {"default": ""}),
-                "path9": ("STRING", {"default": ""}),
-                "path10": ("STRING", {"default": ""}),
+                "path1": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path2": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path3": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path4": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path5": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path6": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path7": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path8": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path9": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
+                "path10": ("STRING", {"default": "", "tooltip": JSON_PATH_TOOLTIP}),
             },
         }
 
@@ -376,33 +336,31 @@ class Soze_JSONPathExtractorNode:
 
     def parse_json_values(self, json_string: str, path1: str, path2: str, path3: str, path4: str, path5: str, path6: str, path7: str, path8: str, path9: str, path10: str) -> tuple:
         try:
-            if (json_string.strip().startswith("```json")):
-                json_string = json_string.replace("```json", "").replace("```", "").strip()
-            data = json.loads(json_string)
+            data = parse_json_text(json_string, allow_literal_eval=False)
 
             paths = [path1, path2, path3, path4, path5, path6, path7, path8, path9, path10]
-            results = []
-
-            for path in paths:
+            compiled = {}
+            for i, path in enumerate(paths):
                 if path.strip() == "":
-                    results.append("")
                     continue
                 try:
-                    value = data
-                    for key in path.split('.'):
-                        if key.isdigit():
-                            value = value[int(key)]
-                        elif '[' in key and ']' in key:
-                            list_key, idx = key[:-1].split('[')
-                            value = value[list_key][int(idx)]
-                        else:
-                            value = value[key]
-                    if isinstance(value, (dict, list)):
-                        results.append(json.dumps(value, indent=2))
-                    else:
-                        results.append(str(value))
-                except Exception:
+                    compiled[i] = compile_path(path)
+                except ValueError:
+                    # A malformed path only blanks its own output
+                    continue
+
+            # All paths are evaluated in one traversal
+            missing = object()
+            values = dict(zip(compiled, evaluate_paths(data, list(compiled.values()), default=missing)))
+            results = []
+            for i in range(len(paths)):
+                value = values.get(i, missing)
+                if value is missing:
                     results.append("")
+                elif isinstance(value, (dict, list)):
+                    results.append(json.dumps(value, indent=2))
+                else:
+                    results.append(str(value))
             return {"ui": {"Value: ": results}, "result": (results[0], results[1], results[2], results[3], results[4], results[5], results[6], results[7], results[8], results[9])}
         except json.JSONDecodeError:
             raise ValueError("Invalid JSON string")
@@ -436,16 +394,9 @@ class Soze_JSONFileLoader:
         try:
             with open(json_filepath, 'r', encoding='utf-8') as file:
                 content = file.read()
-                try:
-                    if (content.strip().startswith("```json")):
-                        content = content.replace("```json", "").replace("```", "").strip()
-                    data = json.loads(content)
-                except json.JSONDecodeError:
-                    # Fallback to ast.literal_eval for Python-style dicts
-                    try:
-                        data = ast.literal_eval(content)
-                    except Exception:
-                        raise json.JSONDecodeError("Invalid JSON or Python literal", content, 0)            
+                # Json_Contents keeps the raw text, the fence is only stripped for parsing.
+                # Fallback to ast.literal_eval for Python-style dicts
+                data = parse_json_text(content)
                 formatted_json = json.dumps(data, indent=2)
                 minified_json = json.dumps(data, separators=(',', ':'))
             return (content, formatted_json, minified_json, json_filepath, os.path.basename(json_filepath), os.path.splitext(os.path.basename(json_filepath))[0])
@@ -476,16 +427,9 @@ class Soze_LoadJSONFileFromFolder():
 
     def load_json_file(self, json_folderpath: str, index: int) -> str:
         try:
-            dir_files = os.listdir(json_folderpath)
-            if len(dir_files) == 0:
-                raise FileNotFoundError(f"Folder only has {len(dir_files)} files in it: {json_folderpath}")
-
-            # Filter files by extension
+            # Filter files by extension, the sorted listing is cached until the folder changes
             valid_extensions = ['.json']
-            dir_files = [f for f in dir_files if any(f.lower().endswith(ext) for ext in valid_extensions)]
-
-            dir_files = sorted(dir_files)
-            dir_files = [os.path.join(json_folderpath, x) for x in dir_files]
+            dir_files = list_folder_files(json_folderpath, valid_extensions)
 
             # Check if index is valid
             if index >= len(dir_files):
@@ -493,20 +437,11 @@ class Soze_LoadJSONFileFromFolder():
 
             # Load only the single JSON file at the specified index
             json_filepath = dir_files[index]
-            if os.path.isdir(json_filepath):
-                raise ValueError(f"Path at index {index} is a directory, not a JSON file.") 
             with open(json_filepath, 'r', encoding='utf-8') as file:
                 content = file.read()
-                try:
-                    if (content.strip().startswith("```json")):
-                        content = content.replace("```json", "").replace("```", "").strip()
-                    data = json.loads(content)
-                except json.JSONDecodeError:
-                    # Fallback to ast.literal_eval for Python-style dicts
-                    try:
-                        data = ast.literal_eval(content)
-                    except Exception:
-                        raise json.JSONDecodeError("Invalid JSON or Python literal", content, 0)            
+                # Json_Contents keeps the raw text, the fence is only stripped for parsing.
+                # Fallback to ast.literal_eval for Python-style dicts
+                data = parse_json_text(content)
                 formatted_json = json.dumps(data, indent=2)
                 minified_json = json.dumps(data, separators=(',', ':'))
             return content, formatted_json, minified_json, json_filepath, os.path.basename(json_filepath), os.path.splitext(os.path.basename(json_filepath))[0]
@@ -532,6 +467,9 @@ class Soze_CreateImageBatchFromJSONArray:
                 "prefix": ("STRING", {"default": ""}),
                 "suffix": ("STRING", {"default": ""}),
             },
+            "optional": {
+                "output_dtype": (OUTPUT_DTYPES, {"default": "float32", "tooltip": "float16/uint8 keep the loaded pixels 2x/4x smaller in memory. Most nodes expect float32, convert with Image To Float (Soze) before using them."}),
+            },
         }
 
     RETURN_TYPES = ("IMAGE",)
@@ -539,18 +477,13 @@ class Soze_CreateImageBatchFromJSONArray:
     FUNCTION = "create_image_batch"
     CATEGORY = "utils"
     
-    def create_image_batch(self, json_array: str, prefix: str, suffix: str):
+    def create_image_batch(self, json_array: str, prefix: str, suffix: str, output_dtype: str = "float32"):
         try:
             # Accept either JSON or Python literal lists
             try:
-                if (json_array.strip().startswith("```json")):
-                    json_array = json_array.replace("```json", "").replace("```", "").strip()
-                data = json.loads(json_array)
+                data = parse_json_text(json_array)
             except json.JSONDecodeError:
-                try:
-                    data = ast.literal_eval(json_array)
-                except Exception:
-                    raise ValueError("Invalid JSON input or Python literal (expected an array of filenames)")
+                raise ValueError("Invalid JSON input or Python literal (expected an array of filenames)")
 
             if not isinstance(data, list):
                 raise ValueError("Input must be a JSON array or Python list")
@@ -576,15 +509,13 @@ class Soze_CreateImageBatchFromJSONArray:
                     if img.size != base_size:
                         img = img.resize(base_size, resample=Image.LANCZOS)
 
-                arr = np.array(img).astype(np.float32) / 255.0
-                # Keep HWC layout to match LoadImage (H, W, C)
-                tensor = torch.from_numpy(arr)
-                images.append(tensor.unsqueeze(0))  # (1, H, W, C)
+                # Keep HWC layout to match LoadImage (H, W, C), converted once the batch is allocated
+                images.append(np.asarray(img))
 
             if len(images) == 0:
                 raise ValueError("No images to create a batch from")
 
-            batch = torch.cat(images, dim=0)  # (N, H, W, C)
+            batch = stack_frames(images, output_dtype)  # (N, H, W, C)
             return (batch,)
 
         except ValueError:
@@ -607,6 +538,9 @@ class Soze_LoadImagesFromJSONArray:
                 "prefix": ("STRING", {"default": ""}),
                 "suffix": ("STRING", {"default": ""}),
             },
+            "optional": {
+                "output_dtype": (OUTPUT_DTYPES, {"default": "float32", "tooltip": "float16/uint8 keep the loaded pixels 2x/4x smaller in memory. Most nodes expect float32, convert with Image To Float (Soze) before using them."}),
+            },
         }
 
     RETURN_TYPES = ("IMAGE", "IMAGE", "IMAGE", "IMAGE", "IMAGE")
@@ -614,18 +548,13 @@ class Soze_LoadImagesFromJSONArray:
     FUNCTION = "load_images_from_json_array"
     CATEGORY = "utils"
     
-    def load_images_from_json_array(self, json_array: str, prefix: str, suffix: str):
+    def load_images_from_json_array(self, json_array: str, prefix: str, suffix: str, output_dtype: str = "float32"):
         try:
             # Accept either JSON or Python literal lists
             try:
-                if (json_array.strip().startswith("```json")):
-                    json_array = json_array.replace("```json", "").replace("```", "").strip()
-                data = json.loads(json_array)
+                data = parse_json_text(json_array)
             except json.JSONDecodeError:
-                try:
-                    data = ast.literal_eval(json_array)
-                except Exception:
-                    raise ValueError("Invalid JSON input or Python literal (expected an array of filenames)")
+                raise ValueError("Invalid JSON input or Python literal (expected an array of filenames)")
 
             if not isinstance(data, list):
                 raise ValueError("Input must be a JSON array or Python list")
@@ -652,23 +581,22 @@ class Soze_LoadImagesFromJSONArray:
                     if img.size != base_size:
                         img = img.resize(base_size, resample=Image.LANCZOS)
 
-                arr = np.array(img).astype(np.float32) / 255.0
-                # Keep HWC layout to match LoadImage (H, W, C)
-                tensor = torch.from_numpy(arr)
-                images.append(tensor.unsqueeze(0))  # (1, H, W, C)
+                # Keep HWC layout to match LoadImage (H, W, C), converted once the batch is allocated
+                images.append(np.asarray(img))
 
             if len(images) == 0:
                 raise ValueError("No images to create a batch from")
 
-            # All images are tensors shaped (1, H, W, C)
+            # One (N, H, W, C) batch, the outputs are (1, H, W, C) slices of it
             # Use None for missing images to match expected behavior
-            img1 = images[0] if len(images) >= 1 else None
-            img2 = images[1] if len(images) >= 2 else None
-            img3 = images[2] if len(images) >= 3 else None
-            img4 = images[3] if len(images) >= 4 else None
+            batch = stack_frames(images, output_dtype)
+            img1 = batch[0:1] if len(images) >= 1 else None
+            img2 = batch[1:2] if len(images) >= 2 else None
+            img3 = batch[2:3] if len(images) >= 3 else None
+            img4 = batch[3:4] if len(images) >= 4 else None
 
             if len(images) > 4:
-                remaining = torch.cat(images[4:], dim=0)
+                remaining = batch[4:]
             else:
                 remaining = None
 
@@ -0,0 +1,77 @@
+#Parsed documents shared by the JSON nodes.
+#When one LLM output fans out to several JSON nodes each of them used to parse it again. The parsed
+#object is now cached by a blake2b digest of the text, so the first node parses it and the others
+#get the same object back. The cached objects are shared: callers must treat them as read only.
+
+import ast
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Tuple
+
+MAX_CACHED_DOCUMENTS = 32
+# Total length of the source texts behind the cached documents, a rough bound on their memory
+MAX_CACHED_CHARS = 64 * 1024 * 1024
+
+_documents: "OrderedDict[Tuple[bytes, bool], Tuple[Any, int]]" = OrderedDict()
+_documents_chars = 0
+_documents_lock = threading.Lock()
+
+
+def strip_json_fence(text: str) -> str:
+    """Removes a markdown ```json fence around text, as LLMs often wrap their JSON in one."""
+    if text.strip().startswith("```json"):
+        return text.replace("```json", "").replace("```", "").strip()
+    return text
+
+
+def _parse(text: str, allow_literal_eval: bool) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        if not allow_literal_eval:
+            raise
+        # Fallback to ast.literal_eval for Python-style dicts and lists
+        try:
+            return ast.literal_eval(text)
+        except Exception:
+            raise json.JSONDecodeError("Invalid JSON or Python literal", text, 0)
+
+
+def parse_json_text(text: str, allow_literal_eval: bool = True) -> Any:
+    """
+    Parses text after stripping a ```json fence, falling back to ast.literal_eval when allowed.
+    Raises json.JSONDecodeError when it cannot be parsed.
+    The result is the cached object itself, shared with every caller that parses the same text.
+    It is read only: a caller that needs to change it must work on a copy.deepcopy of it.
+    """
+    global _documents_chars
+    text = strip_json_fence(text)
+    key = (hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest(), allow_literal_eval)
+    with _documents_lock:
+        cached = _documents.get(key)
+        if cached is not None:
+            _documents.move_to_end(key)
+            return cached[0]
+
+    data = _parse(text, allow_literal_eval)
+
+    # Documents larger than the whole budget are not kept
+    if len(text) <= MAX_CACHED_CHARS:
+        with _documents_lock:
+            if key not in _documents:
+                _documents[key] = (data, len(text))
+                _documents_chars += len(text)
+            _documents.move_to_end(key)
+            while len(_documents) > MAX_CACHED_DOCUMENTS or _documents_chars > MAX_CACHED_CHARS:
+                _, (_, chars) = _documents.popitem(last=False)
+                _documents_chars -= chars
+    return data
+
+
+def clear_json_cache():
+    global _documents_chars
+    with _documents_lock:
+        _documents.clear()
+        _documents_chars = 0
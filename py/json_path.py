@@ -0,0 +1,279 @@
+#Compiled path expressions for the JSON nodes.
+#An expression is parsed once into steps and cached by its text. Several paths over one document
+#are merged into a prefix tree and evaluated in one traversal, so shared prefixes are walked once.
+#
+#Syntax, all optional and combinable:
+#  a.b.0          keys separated by dots, a number indexes into a list (negative counts from the end)
+#  a[0] a['x.y']  bracket index or quoted key
+#  $ $.a $[0]     anchors the path at the document root, keys such as $schema are plain keys
+#  a.* a[*]       every item of a list or value of an object
+#  a[1:3] a[::2]  list slices
+#  a[?price<10]   items whose field compares true: == != < <= > >= with a JSON literal or bare word,
+#                 [?(@.price < 10)] is accepted as well, [?field] keeps items that have the field
+#A path that uses *, a slice or a filter matches a list of values, any other path a single value.
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+# Steps are tuples so paths can share prefix tree nodes
+_CHILD, _KEY, _INDEX, _SLICE, _WILDCARD, _FILTER = range(6)
+_SINGULAR_STEPS = (_CHILD, _KEY, _INDEX)
+
+_FILTER_EXPRESSION = re.compile(r"^(.*?)\s*(==|!=|<=|>=|<|>|=)\s*(.*)$", re.S)
+_INTEGER = re.compile(r"^-?\d+$")
+
+
+class JSONPath:
+    def __init__(self, expression: str, steps: Tuple[tuple, ...], rooted: bool):
+        self.expression = expression
+        self.steps = steps
+        # Whether the expression is anchored at the root with $
+        self.rooted = rooted
+        self.singular = all(step[0] in _SINGULAR_STEPS for step in steps)
+
+    def find(self, data: Any) -> List[Any]:
+        """Returns every value the path matches, in document order."""
+        return _evaluate(data, [self])[0][0]
+
+    def get(self, data: Any) -> Any:
+        """
+        Returns the value of a singular path, raising KeyError or IndexError when it is missing,
+        or the list of matches of any other path.
+        """
+        matches, errors = _evaluate(data, [self])
+        if not self.singular:
+            return matches[0]
+        if not matches[0]:
+            raise errors[0]
+        return matches[0][0]
+
+    def __repr__(self):
+        return f"JSONPath({self.expression!r})"
+
+
+def _find_bracket_end(expression: str, start: int) -> int:
+    quote = None
+    for i in range(start, len(expression)):
+        c = expression[i]
+        if quote is not None:
+            if c == quote:
+                quote = None
+        elif c in "'\"":
+            quote = c
+        elif c == "]":
+            return i
+    raise ValueError(f"Unclosed '[' in JSON path: {expression}")
+
+
+def _parse_literal(text: str) -> Any:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == "'":
+        return text[1:-1]
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        return text
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"Filters compare against a string, number, true, false or null, not {text}")
+    return value
+
+
+def _parse_filter(text: str, expression: str) -> tuple:
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = text[1:-1].strip()
+    match = _FILTER_EXPRESSION.match(text)
+    if match is None:
+        field, op, value = text, None, None
+    else:
+        field, op, value = match.group(1), match.group(2), _parse_literal(match.group(3))
+        if op == "=":
+            op = "=="
+    field = field.strip()
+    if field.startswith("@"):
+        field = field[1:].lstrip(".")
+    if not field and op is None:
+        raise ValueError(f"Empty filter in JSON path: {expression}")
+    field_path = compile_path(field)
+    if not field_path.singular:
+        raise ValueError(f"Filter fields must select a single value: {expression}")
+    return (_FILTER, field_path.steps, op, value)
+
+
+def _parse_bracket(text: str, expression: str) -> tuple:
+    text = text.strip()
+    if text == "*":
+        return (_WILDCARD,)
+    if text.startswith("?"):
+        return _parse_filter(text[1:], expression)
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        return (_KEY, text[1:-1])
+    if _INTEGER.match(text):
+        return (_INDEX, int(text))
+    if ":" in text:
+        parts = [part.strip() for part in text.split(":")]
+        if len(parts) > 3 or not all(part == "" or _INTEGER.match(part) for part in parts):
+            raise ValueError(f"Invalid slice [{text}] in JSON path: {expression}")
+        parts += [""] * (3 - len(parts))
+        start, stop, step = (int(part) if part else None for part in parts)
+        if step == 0:
+            raise ValueError(f"Slice step cannot be 0 in JSON path: {expression}")
+        return (_SLICE, start, stop, step)
+    # An unquoted name, as in the old key[name] form
+    return (_KEY, text)
+
+
+@lru_cache(maxsize=256)
+def compile_path(expression: str) -> JSONPath:
+    """Parses expression into a JSONPath, raising ValueError when it is malformed. Cached per expression."""
+    text = expression.strip()
+    # $ alone or before . or [ is the root, otherwise it starts a key such as $schema
+    rooted = text == "$" or text.startswith("$.") or text.startswith("$[")
+    pos = 1 if rooted else 0
+    steps = []
+    while pos < len(text):
+        c = text[pos]
+        if c == ".":
+            pos += 1
+            continue
+        if c == "[":
+            end = _find_bracket_end(text, pos + 1)
+            steps.append(_parse_bracket(text[pos + 1:end], expression))
+            pos = end + 1
+            continue
+        end = pos
+        while end < len(text) and text[end] not in ".[":
+            end += 1
+        name = text[pos:end].strip()
+        if name == "*":
+            steps.append((_WILDCARD,))
+        elif name:
+            steps.append((_CHILD, name))
+        pos = end
+    return JSONPath(expression, tuple(steps), rooted)
+
+
+def _children(value: Any) -> List[Any]:
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        return list(value.values())
+    return []
+
+
+def _lookup(value: Any, step: tuple) -> Any:
+    """Returns the child selected by a singular step, raising KeyError or IndexError when there is none."""
+    kind, name = step
+    if isinstance(value, list) and kind != _KEY and (kind == _INDEX or _INTEGER.match(name)):
+        idx = int(name)
+        if -len(value) <= idx < len(value):
+            return value[idx]
+        raise IndexError(f"Index '{name}' out of range")
+    if isinstance(value, dict):
+        key = str(name)
+        if key in value:
+            return value[key]
+    raise KeyError(f"Key '{name}' not found")
+
+
+def _compare(left: Any, op: str, right: Any) -> bool:
+    # Booleans are not numbers here, so true does not equal 1
+    if isinstance(left, bool) != isinstance(right, bool):
+        return op == "!="
+    if op == "==":
+        return left == right
+    if op == "!=":
+        return left != right
+    # Order only numbers with numbers and strings with strings
+    numbers = (int, float)
+    if isinstance(left, bool):
+        return False
+    if not ((isinstance(left, numbers) and isinstance(right, numbers)) or (isinstance(left, str) and isinstance(right, str))):
+        return False
+    if op == "<":
+        return left < right
+    if op == "<=":
+        return left <= right
+    if op == ">":
+        return left > right
+    return left >= right
+
+
+def _matches_filter(item: Any, field_steps: Tuple[tuple, ...], op: Optional[str], value: Any) -> bool:
+    try:
+        for step in field_steps:
+            item = _lookup(item, step)
+    except LookupError:
+        return False
+    return True if op is None else _compare(item, op, value)
+
+
+def _select(value: Any, step: tuple) -> List[Any]:
+    kind = step[0]
+    if kind in _SINGULAR_STEPS:
+        return [_lookup(value, step)]
+    if kind == _WILDCARD:
+        return _children(value)
+    if kind == _SLICE:
+        return value[slice(*step[1:])] if isinstance(value, list) else []
+    return [item for item in _children(value) if _matches_filter(item, *step[1:])]
+
+
+class _Node:
+    __slots__ = ("children", "ends")
+
+    def __init__(self):
+        self.children = {}
+        # Positions of the paths that end at this node
+        self.ends = []
+
+
+def _record_error(node: _Node, error: LookupError, errors: List[Optional[LookupError]]):
+    for position in node.ends:
+        if errors[position] is None:
+            errors[position] = error
+    for child in node.children.values():
+        _record_error(child, error, errors)
+
+
+def _walk(node: _Node, value: Any, matches: List[List[Any]], errors: List[Optional[LookupError]]):
+    for position in node.ends:
+        matches[position].append(value)
+    for step, child in node.children.items():
+        try:
+            selected = _select(value, step)
+        except LookupError as e:
+            _record_error(child, e, errors)
+            continue
+        for item in selected:
+            _walk(child, item, matches, errors)
+
+
+def _evaluate(data: Any, paths: Sequence[JSONPath]) -> Tuple[List[List[Any]], List[Optional[LookupError]]]:
+    root = _Node()
+    for position, path in enumerate(paths):
+        node = root
+        for step in path.steps:
+            node = node.children.setdefault(step, _Node())
+        node.ends.append(position)
+    matches = [[] for _ in paths]
+    errors = [None] * len(paths)
+    _walk(root, data, matches, errors)
+    return matches, errors
+
+
+def evaluate_paths(data: Any, paths: Sequence[JSONPath], default: Any = None) -> List[Any]:
+    """
+    Evaluates several paths over data in one traversal. Each result is what JSONPath.get returns,
+    or default for a singular path that is missing.
+    """
+    matches, _ = _evaluate(data, paths)
+    results = []
+    for path, found in zip(paths, matches):
+        if not path.singular:
+            results.append(found)
+        else:
+            results.append(found[0] if found else default)
+    return results
@@ -0,0 +1,274 @@
+#Append-only binary record log, a lossless and O(1) per row alternative to CSV logging.
+#A log is an 8 byte magic followed by records, each a little endian uint32 payload length and
+#the payload: a uint16 field count, then per field a type byte and its value (str as uint32
+#length + utf-8, int64, float64, or null). A sidecar <log>.recidx holds the uint64 offset of
+#every record, so record N is one seek. The index is normally only appended to, and any records
+#missing from it (e.g. after a crash between the two writes) are re-indexed on the next access.
+#A record only partially written by a crashed writer is cut off by the next append, and an index
+#left behind by a deleted log is rebuilt from the log it no longer matches.
+
+import csv
+import os
+import struct
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .csv_batch_writer import lock_file, unlock_file
+
+RECORD_LOG_MAGIC = b"SOZEREC1"
+RECORD_LOG_EXTENSION = ".srec"
+RECORD_INDEX_EXTENSION = ".recidx"
+
+_TYPE_STR, _TYPE_INT, _TYPE_FLOAT, _TYPE_NULL = range(4)
+_LENGTH = struct.Struct("<I")
+_FIELD_COUNT = struct.Struct("<H")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_OFFSET = struct.Struct("<Q")
+
+
+def encode_record(fields: Sequence[Any]) -> bytes:
+    parts = [_FIELD_COUNT.pack(len(fields))]
+    for value in fields:
+        if value is None:
+            parts.append(bytes((_TYPE_NULL,)))
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            data = str(value).encode('utf-8')
+            parts.append(bytes((_TYPE_STR,)) + _LENGTH.pack(len(data)) + data)
+        elif isinstance(value, int):
+            parts.append(bytes((_TYPE_INT,)) + _INT.pack(value))
+        else:
+            parts.append(bytes((_TYPE_FLOAT,)) + _FLOAT.pack(value))
+    payload = b''.join(parts)
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def decode_record(payload: bytes) -> List[Any]:
+    (count,) = _FIELD_COUNT.unpack_from(payload, 0)
+    pos = _FIELD_COUNT.size
+    fields = []
+    for _ in range(count):
+        field_type = payload[pos]
+        pos += 1
+        if field_type == _TYPE_STR:
+            (length,) = _LENGTH.unpack_from(payload, pos)
+            pos += _LENGTH.size
+            fields.append(payload[pos:pos + length].decode('utf-8'))
+            pos += length
+        elif field_type == _TYPE_INT:
+            fields.append(_INT.unpack_from(payload, pos)[0])
+            pos += _INT.size
+        elif field_type == _TYPE_FLOAT:
+            fields.append(_FLOAT.unpack_from(payload, pos)[0])
+            pos += _FLOAT.size
+        elif field_type == _TYPE_NULL:
+            fields.append(None)
+        else:
+            raise ValueError(f"Unknown field type {field_type} in record log")
+    return fields
+
+
+def _index_path(path: str) -> str:
+    return path + RECORD_INDEX_EXTENSION
+
+
+def _record_end(log_f, offset: int, log_size: int) -> Optional[int]:
+    """Returns where the record at offset ends, None when it does not fit in the log."""
+    if offset < len(RECORD_LOG_MAGIC) or offset + _LENGTH.size > log_size:
+        return None
+    log_f.seek(offset)
+    (length,) = _LENGTH.unpack(log_f.read(_LENGTH.size))
+    end = offset + _LENGTH.size + length
+    return end if end <= log_size else None
+
+
+def _index_matches(log_f, index_f, count: int, log_size: int) -> bool:
+    """
+    Checks that the index still describes this log: it starts at the first record and its last
+    offsets are consecutive records. A log deleted and written again leaves a stale index behind.
+    """
+    index_f.seek(0)
+    (first,) = _OFFSET.unpack(index_f.read(_OFFSET.size))
+    if first != len(RECORD_LOG_MAGIC):
+        return False
+    start = max(0, count - 2)
+    index_f.seek(start * _OFFSET.size)
+    offsets = [_OFFSET.unpack(index_f.read(_OFFSET.size))[0] for _ in range(start, count)]
+    end = None
+    for offset in offsets:
+        if end is not None and offset != end:
+            return False
+        end = _record_end(log_f, offset, log_size)
+        if end is None:
+            return False
+    return True
+
+
+def _sync_index(log_f, index_path: str) -> Tuple[int, int]:
+    """
+    Appends the offsets of any records the index is missing and returns the record count and
+    the offset where the last complete record ends. A partially written last record is left out.
+    """
+    log_size = log_f.seek(0, os.SEEK_END)
+    with open(index_path, 'ab+') as index_f:
+        index_size = index_f.seek(0, os.SEEK_END)
+        # Drop a partially written offset
+        count = index_size // _OFFSET.size
+        if index_size != count * _OFFSET.size:
+            index_f.truncate(count * _OFFSET.size)
+
+        # An index that does not match the log is rebuilt by scanning the whole log
+        if count > 0 and not _index_matches(log_f, index_f, count, log_size):
+            index_f.truncate(0)
+            count = 0
+
+        if count > 0:
+            index_f.seek((count - 1) * _OFFSET.size)
+            (offset,) = _OFFSET.unpack(index_f.read(_OFFSET.size))
+            offset = _record_end(log_f, offset, log_size)
+        else:
+            offset = len(RECORD_LOG_MAGIC)
+
+        missing = []
+        while offset + _LENGTH.size <= log_size:
+            log_f.seek(offset)
+            (length,) = _LENGTH.unpack(log_f.read(_LENGTH.size))
+            if offset + _LENGTH.size + length > log_size:
+                break
+            missing.append(offset)
+            offset += _LENGTH.size + length
+        if missing:
+            index_f.seek(0, os.SEEK_END)
+            index_f.write(b''.join(_OFFSET.pack(offset) for offset in missing))
+        return count + len(missing), offset
+
+
+def append_records(path: str, records: Iterable[Sequence[Any]]) -> int:
+    """Appends records to the log at path, creating it if needed, and returns the new record count."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data = b''.join(encode_record(record) for record in records)
+    with open(path, 'ab+') as log_f:
+        lock_file(log_f)
+        try:
+            if log_f.seek(0, os.SEEK_END) == 0:
+                log_f.write(RECORD_LOG_MAGIC)
+                log_f.flush()
+            _check_magic(log_f, path)
+            # Index anything a crashed writer left unindexed, and cut off a record it only partially
+            # wrote, so the new records start where the last complete one ends
+            _, end = _sync_index(log_f, _index_path(path))
+            log_f.truncate(end)
+            log_f.seek(0, os.SEEK_END)
+            log_f.write(data)
+            log_f.flush()
+            return _sync_index(log_f, _index_path(path))[0]
+        finally:
+            unlock_file(log_f)
+
+
+def _check_magic(log_f, path: str):
+    log_f.seek(0)
+    if log_f.read(len(RECORD_LOG_MAGIC)) != RECORD_LOG_MAGIC:
+        raise ValueError(f"Not a Soze record log: {path}")
+
+
+class RecordLogReader:
+    """Reads records by number from a record log, refreshing the index when the log has grown."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def record_count(self) -> int:
+        with open(self.path, 'rb') as log_f:
+            _check_magic(log_f, self.path)
+            lock_file(log_f)
+            try:
+                return _sync_index(log_f, _index_path(self.path))[0]
+            finally:
+                unlock_file(log_f)
+
+    def read(self, index: int) -> List[Any]:
+        try:
+            with open(_index_path(self.path), 'rb') as index_f:
+                index_f.seek(index * _OFFSET.size)
+                data = index_f.read(_OFFSET.size)
+        except FileNotFoundError:
+            data = b''
+        if len(data) != _OFFSET.size:
+            # The index may be behind the log, bring it up to date once before giving up
+            count = self.record_count()
+            if index >= count:
+                raise IndexError(f"Record {index} is out of range for {self.path} ({count} records)")
+            return self.read(index)
+        (offset,) = _OFFSET.unpack(data)
+        with open(self.path, 'rb') as log_f:
+            log_f.seek(offset)
+            return self._read_next(log_f, index)
+
+    def _read_next(self, log_f, index: int) -> List[Any]:
+        try:
+            (length,) = _LENGTH.unpack(log_f.read(_LENGTH.size))
+            payload = log_f.read(length)
+            if len(payload) != length:
+                raise ValueError("record is truncated")
+            return decode_record(payload)
+        except (ValueError, IndexError, struct.error) as e:
+            # UnicodeDecodeError is a ValueError
+            raise ValueError(f"Record {index} of {self.path} is corrupt: {e}") from e
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        count = self.record_count()
+        with open(self.path, 'rb') as log_f:
+            log_f.seek(len(RECORD_LOG_MAGIC))
+            for index in range(count):
+                yield self._read_next(log_f, index)
+
+
+def _csv_value(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def csv_to_record_log(csv_path: str, log_path: str, batch_size: int = 10000) -> int:
+    """
+    Writes every row of a CSV file as string fields to a new record log, replacing log_path.
+    Returns the record count.
+    """
+    # Built next to the target and swapped in, so converting again never duplicates records
+    tmp_path = f"{log_path}.tmp"
+    for path in (tmp_path, _index_path(tmp_path)):
+        if os.path.exists(path):
+            os.remove(path)
+    count = 0
+    # Same encoding fallback as the CSV readers
+    encoding = 'utf-8-sig'
+    try:
+        with open(csv_path, 'r', newline='', encoding=encoding) as f:
+            for _ in f:
+                pass
+    except UnicodeDecodeError:
+        encoding = 'windows-1252'
+    with open(csv_path, 'r', newline='', encoding=encoding) as f:
+        batch = []
+        for row in csv.reader(f):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                count = append_records(tmp_path, batch)
+                batch = []
+        # An empty CSV still produces a valid, empty log
+        count = append_records(tmp_path, batch)
+    os.replace(tmp_path, log_path)
+    os.replace(_index_path(tmp_path), _index_path(log_path))
+    return count
+
+
+def record_log_to_csv(log_path: str, csv_path: str) -> int:
+    """Writes every record of a log to a new CSV file with standard quoting. Returns the number of rows."""
+    os.makedirs(os.path.dirname(os.path.abspath(csv_path)), exist_ok=True)
+    count = 0
+    tmp_path = f"{csv_path}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for record in RecordLogReader(log_path):
+            writer.writerow([_csv_value(value) for value in record])
+            count += 1
+    os.replace(tmp_path, csv_path)
+    return count
@@ -0,0 +1,136 @@
+import os
+
+from .record_store import RECORD_LOG_EXTENSION, RecordLogReader, append_records, csv_to_record_log, record_log_to_csv
+
+
+def resolve_log_path(log_filename_path):
+    # Normalize path separators for OS compatibility
+    log_path = os.path.normpath(log_filename_path.strip())
+    if not os.path.splitext(log_path)[1]:
+        log_path += RECORD_LOG_EXTENSION
+    return log_path
+
+
+class Soze_RecordLogWriter:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "log_filename_path": ("STRING", {"default": "", "multiline": True, "tooltip": f"Absolute path of the record log, {RECORD_LOG_EXTENSION} is added when there is no extension."}),
+                "value1": ("STRING", {"default": "", "forceInput": True }),
+                "value2": ("STRING", {"default": "", "forceInput": True }),
+            },
+            "optional": {
+                "value3": ("STRING", {"default": ""}),
+                "value4": ("STRING", {"default": ""}),
+                "value5": ("STRING", {"default": ""}),
+                "value6": ("STRING", {"default": ""}),
+                "value7": ("STRING", {"default": ""}),
+                "value8": ("STRING", {"default": ""}),
+                "value9": ("STRING", {"default": ""}),
+                "value10": ("STRING", {"default": ""}),
+            }
+        }
+
+    RETURN_NAMES = ("Record_Count",)
+    RETURN_TYPES = ("INT",)
+    FUNCTION = "write_record"
+    CATEGORY = "utils"
+    OUTPUT_NODE = True
+    DESCRIPTION = "Appends the values as one record to a binary record log. Unlike CSV Writer, values are stored exactly and keep their column positions."
+
+    @classmethod
+    def IS_CHANGED(self, *args, **kwargs):
+        # Every execution appends a record
+        return float("NaN")
+
+    def write_record(self, log_filename_path, value1="", value2="", value3="", value4="", value5="", value6="", value7="", value8="", value9="", value10=""):
+        if log_filename_path.strip() == "":
+            raise ValueError("Record log path cannot be empty.")
+        values = [value1, value2, value3, value4, value5, value6, value7, value8, value9, value10]
+
+        # Trailing empty values are dropped, empty values in between keep their position
+        while values and values[-1] == "":
+            values.pop()
+
+        return (append_records(resolve_log_path(log_filename_path), [values]),)
+
+
+class Soze_RecordLogReader:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "log_filename_path": ("STRING", {"default": "", "multiline": True}),
+                "index": ("INT", {"default": 0, "min": 0, "max": 100000000, "control_after_generate": True, "step": 1, "tooltip": "The record number to read."}),
+            }
+        }
+
+    RETURN_NAMES = ('Column_1', 'Column_2', 'Column_3', 'Column_4', 'Column_5', 'Column_6', 'Column_7', 'Column_8', 'Column_9', 'Column_10', 'Entire_Line', 'Record_Count')
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "INT")
+    FUNCTION = "read_record"
+    CATEGORY = "utils"
+    DESCRIPTION = "Reads one record of a binary record log by number, with the same outputs as CSV Reader."
+
+    @classmethod
+    def IS_CHANGED(self, log_filename_path, index):
+        try:
+            st = os.stat(resolve_log_path(log_filename_path))
+        except OSError:
+            return float("NaN")
+        return f"{st.st_size}:{st.st_mtime_ns}"
+
+    def read_record(self, log_filename_path, index):
+        log_path = resolve_log_path(log_filename_path)
+        if not os.path.exists(log_path):
+            raise FileNotFoundError(f"Record log not found: {log_path}")
+
+        reader = RecordLogReader(log_path)
+        record_count = reader.record_count()
+        if index >= record_count:
+            raise ValueError(f"There are no more records in the log ({record_count})")
+
+        values = ["" if value is None else str(value) for value in reader.read(index)]
+        output = values[:10] + [""] * (10 - len(values))
+        entire_line = ",".join(values)
+        return tuple(output + [entire_line, record_count])
+
+
+class Soze_RecordLogConverter:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "source_path": ("STRING", {"default": ""}),
+                "target_path": ("STRING", {"default": ""}),
+                "direction": (["csv_to_log", "log_to_csv"], {"default": "csv_to_log", "tooltip": "csv_to_log writes a new log from the CSV rows, replacing the target. log_to_csv writes a new CSV with standard quoting."}),
+            }
+        }
+
+    RETURN_NAMES = ("Target_Path", "Row_Count")
+    RETURN_TYPES = ("STRING", "INT")
+    FUNCTION = "convert"
+    CATEGORY = "utils"
+    OUTPUT_NODE = True
+    DESCRIPTION = "Converts between CSV files and binary record logs."
+
+    @classmethod
+    def IS_CHANGED(self, source_path, target_path, direction):
+        # The target is rewritten from the source, so converting again is only needed when the
+        # source changed or the target was removed
+        target = resolve_log_path(target_path) if direction == "csv_to_log" else os.path.normpath(target_path.strip())
+        try:
+            st = os.stat(os.path.normpath(source_path.strip()))
+        except OSError:
+            return float("NaN")
+        return f"{direction}:{st.st_size}:{st.st_mtime_ns}:{os.path.exists(target)}"
+
+    def convert(self, source_path, target_path, direction):
+        source_path = os.path.normpath(source_path.strip())
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"File not found: {source_path}")
+        if direction == "csv_to_log":
+            target_path = resolve_log_path(target_path)
+            return (target_path, csv_to_record_log(source_path, target_path))
+        target_path = os.path.normpath(target_path.strip())
+        return (target_path, record_log_to_csv(source_path, target_path))
@@ -0,0 +1,107 @@
+#In-process state shared between executions, e.g. the previous filename a node loaded.
+#Replaces the small scratch files (sozeimagecache.txt etc.) that were rewritten in the working
+#directory on every run. Values are namespaced per node id and kept in memory; set
+#SOZE_STATE_SNAPSHOT to a file path to also have them periodically written to disk and
+#restored on the next start (SOZE_STATE_SNAPSHOT_INTERVAL sets the period in seconds, default 30).
+
+import atexit
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+
+class StateStore:
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._snapshot_path: Optional[str] = None
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(namespace, {}).get(key, default)
+
+    def set(self, namespace: str, key: str, value: Any):
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = value
+            self._dirty = True
+
+    def swap(self, namespace: str, key: str, value: Any, default: Any = None) -> Any:
+        """Stores value and returns the previous one in a single step."""
+        with self._lock:
+            values = self._data.setdefault(namespace, {})
+            previous = values.get(key, default)
+            values[key] = value
+            self._dirty = True
+            return previous
+
+    def clear(self, namespace: Optional[str] = None):
+        with self._lock:
+            if namespace is None:
+                self._data.clear()
+            else:
+                self._data.pop(namespace, None)
+            self._dirty = True
+
+    def load_snapshot(self, path: str):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error reading state snapshot {path}: {e}")
+            return
+        if isinstance(data, dict):
+            with self._lock:
+                for namespace, values in data.items():
+                    if isinstance(values, dict):
+                        self._data.setdefault(namespace, {}).update(values)
+
+    def snapshot(self):
+        if self._snapshot_path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {namespace: dict(values) for namespace, values in self._data.items()}
+            self._dirty = False
+        tmp_path = f"{self._snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, default=str)
+            os.replace(tmp_path, self._snapshot_path)
+        except Exception as e:
+            with self._lock:
+                self._dirty = True
+            print(f"Error writing state snapshot {self._snapshot_path}: {e}")
+
+    def enable_snapshots(self, path: str, interval: float = 30.0):
+        self._snapshot_path = path
+        self.load_snapshot(path)
+        if self._snapshot_thread is None:
+            self._snapshot_thread = threading.Thread(target=self._snapshot_loop, args=(interval,), name="soze_state_snapshot", daemon=True)
+            self._snapshot_thread.start()
+            atexit.register(self.snapshot)
+
+    def _snapshot_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            self.snapshot()
+
+
+STATE = StateStore()
+
+if os.environ.get("SOZE_STATE_SNAPSHOT"):
+    try:
+        _interval = float(os.environ.get("SOZE_STATE_SNAPSHOT_INTERVAL", "30"))
+    except ValueError:
+        _interval = 30.0
+    STATE.enable_snapshots(os.environ["SOZE_STATE_SNAPSHOT"], _interval)
+
+
+def node_namespace(unique_id, fallback: str) -> str:
+    # unique_id is only missing when a node is called outside of a normal prompt
+    return str(unique_id) if unique_id is not None else fallback
@@ -9,13 +9,12 @@ from comfy_api.latest import ComfyExtension, io
 from comfy_api.latest import _io
 
 from .utils import (
-    read_from_file,
-    write_to_file,
     replace_date_placeholders,
     _remove_non_ascii,
     _sanitize_tuple,
     _sanitize_filename
 )
+from .state_store import STATE, node_namespace
 
 
 # class Soze_IsInputInList:
@@ -118,6 +117,9 @@ class Soze_PromptCache:
             "required": {
                 "use_new_prompt": ("BOOL", {"default": True}),
                 "new_prompt": ("STRING", {"default": "", "forceInput": True}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
@@ -126,13 +128,13 @@ class Soze_PromptCache:
     FUNCTION = "prompt_with_cache"
     CATEGORY = "strings"
 
-    def prompt_with_cache(self, new_prompt, use_new_prompt):
+    def prompt_with_cache(self, new_prompt, use_new_prompt, unique_id=None):
+        namespace = node_namespace(unique_id, "Soze_PromptCache")
         if use_new_prompt:
-            write_to_file('sozepromptcache.txt', new_prompt)
+            STATE.set(namespace, "prompt", new_prompt)
             return _sanitize_tuple((new_prompt, True))
         else:
-            old_prompt = read_from_file('sozepromptcache.txt')
-            write_to_file('sozepromptcache.txt', new_prompt)
+            old_prompt = STATE.swap(namespace, "prompt", new_prompt)
             if old_prompt:
                 return _sanitize_tuple((old_prompt, False))
             else:
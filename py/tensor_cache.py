@@ -0,0 +1,78 @@
+#Memory-mappable image cache files, for moving frame batches between workflows without
+#encoding or decoding them. A file is an 8 byte magic, a little endian uint32 header length,
+#a JSON header ({"dtype", "shape"}) padded so the payload starts on a 64 byte boundary,
+#then the contiguous (N, H, W, C) payload.
+
+import json
+import os
+import struct
+from typing import Tuple
+
+import numpy as np
+import torch
+
+from .image_decode import convert_image_dtype
+
+TENSOR_CACHE_MAGIC = b"SOZEIMG1"
+TENSOR_CACHE_EXTENSION = ".simg"
+TENSOR_CACHE_DTYPES = ["uint8", "float16", "float32"]
+PAYLOAD_ALIGNMENT = 64
+
+
+def write_tensor_cache(images: torch.Tensor, filepath: str, dtype: str = "uint8") -> str:
+    """Writes images as a tensor cache file, going through a temporary file so readers never see a partial write."""
+    if dtype not in TENSOR_CACHE_DTYPES:
+        raise ValueError(f"Unsupported tensor cache dtype: {dtype}")
+    payload = convert_image_dtype(images, dtype).contiguous().cpu().numpy()
+
+    header = json.dumps({"dtype": dtype, "shape": list(payload.shape)}).encode("utf-8")
+    header_end = len(TENSOR_CACHE_MAGIC) + 4 + len(header)
+    header += b" " * (-header_end % PAYLOAD_ALIGNMENT)
+
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    tmp_path = f"{filepath}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(TENSOR_CACHE_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            payload.tofile(f)
+        try:
+            os.replace(tmp_path, filepath)
+        except PermissionError as e:
+            # Windows cannot replace a file that is still memory-mapped by a loaded cache
+            raise PermissionError(f"Cannot overwrite {filepath}, it is probably still mapped by a Load Image Cache (Soze) output. "
+                                  "Save to a different path, or restart ComfyUI to release the loaded images.") from e
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return filepath
+
+
+def read_tensor_cache_header(filepath: str) -> Tuple[str, Tuple[int, ...], int]:
+    """Returns the dtype, shape and payload offset of a tensor cache file."""
+    with open(filepath, "rb") as f:
+        magic = f.read(len(TENSOR_CACHE_MAGIC))
+        if magic != TENSOR_CACHE_MAGIC:
+            raise ValueError(f"Not a Soze image cache file: {filepath}")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    offset = len(TENSOR_CACHE_MAGIC) + 4 + header_len
+    return header["dtype"], tuple(header["shape"]), offset
+
+
+def read_tensor_cache(filepath: str) -> torch.Tensor:
+    """
+    Maps a tensor cache file into a tensor without reading it. Pages are loaded on first access,
+    and the map is copy-on-write, so writing to the tensor never changes the file.
+    """
+    dtype, shape, offset = read_tensor_cache_header(filepath)
+    if dtype not in TENSOR_CACHE_DTYPES:
+        raise ValueError(f"Unsupported tensor cache dtype {dtype} in {filepath}")
+    if 0 in shape:
+        return torch.empty(shape, dtype=getattr(torch, dtype))
+    payload = np.memmap(filepath, dtype=np.dtype(dtype), mode="c", offset=offset, shape=shape)
+    return torch.from_numpy(payload)
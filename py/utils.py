@@ -6,7 +6,11 @@ import PIL.Image
 import numpy as np
 import torch
 import datetime
+import hashlib
+import os
 import re
+import threading
+from collections import OrderedDict
 from PIL import Image
 from torch import Tensor
 
@@ -85,6 +89,60 @@ def write_to_file(writefilename, writecontent):
 
 
 
+_fingerprint_cache: "OrderedDict[Tuple[str, bool], Tuple[Tuple[int, int, int], str]]" = OrderedDict()
+_fingerprint_lock = threading.Lock()
+FINGERPRINT_CACHE_SIZE = 1024
+FAST_HASH_SAMPLES = 16
+FAST_HASH_CHUNK = 64 * 1024
+
+def _sha256_file(filepath):
+    m = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            m.update(chunk)
+    return m.digest().hex()
+
+def _sampled_hash_file(filepath, size, mtime_ns):
+    # Hashes evenly spaced chunks plus the size and mtime, so it never misses a rewrite that touches the mtime
+    m = hashlib.sha256(f"{size}:{mtime_ns}".encode())
+    with open(filepath, 'rb') as f:
+        if size <= FAST_HASH_SAMPLES * FAST_HASH_CHUNK:
+            m.update(f.read())
+        else:
+            step = (size - FAST_HASH_CHUNK) // (FAST_HASH_SAMPLES - 1)
+            for sample in range(FAST_HASH_SAMPLES):
+                f.seek(sample * step)
+                m.update(f.read(FAST_HASH_CHUNK))
+    return m.digest().hex()
+
+def file_fingerprint(filepath, fast_hash=False):
+    """
+    Content hash of a file for IS_CHANGED, cached on (path, size, mtime_ns, inode).
+    The file is only read again when its stat changes. fast_hash samples chunks instead of hashing the whole file.
+    """
+    st = os.stat(filepath)
+    stamp = (st.st_size, st.st_mtime_ns, st.st_ino)
+    key = (filepath, fast_hash)
+
+    with _fingerprint_lock:
+        cached = _fingerprint_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            _fingerprint_cache.move_to_end(key)
+            return cached[1]
+
+    if fast_hash:
+        digest = _sampled_hash_file(filepath, st.st_size, st.st_mtime_ns)
+    else:
+        digest = _sha256_file(filepath)
+
+    with _fingerprint_lock:
+        _fingerprint_cache[key] = (stamp, digest)
+        _fingerprint_cache.move_to_end(key)
+        while len(_fingerprint_cache) > FINGERPRINT_CACHE_SIZE:
+            _fingerprint_cache.popitem(last=False)
+    return digest
+
+
 # Hack: string type that is always equal in not equal comparisons
 class AnyType(str):
     def __ne__(self, __value: object) -> bool:
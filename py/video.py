@@ -6,6 +6,8 @@ import folder_paths # type: ignore
 from comfy.comfy_types import IO, ComfyNodeABC
 from comfy_api.input_impl import VideoFromFile
 
+from .folder_index import list_folder_files
+
 
 class Soze_AppendToVideo:
     @classmethod
@@ -130,16 +132,9 @@ class Soze_LoadVideosFromFolder:
     def load_videos_from_folder(self, Input_Folder, index):
         if not os.path.isdir(Input_Folder):
             raise FileNotFoundError(f"Folder not found: {Input_Folder}")
-        dir_files = os.listdir(Input_Folder)
-        if len(dir_files) == 0:
-            raise FileNotFoundError(f"Folder only has {len(dir_files)} files in it: {Input_Folder}")
-
-        # Filter files by extension
+        # Filter files by extension, the sorted listing is cached until the folder changes
         valid_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm', '.mpeg', '.mpg', '.flv', '.mp3', '.wav', '.aac']
-        dir_files = [f for f in dir_files if any(f.lower().endswith(ext) for ext in valid_extensions)]
-
-        dir_files = sorted(dir_files)
-        dir_files = [os.path.join(Input_Folder, x) for x in dir_files]
+        dir_files = list_folder_files(Input_Folder, valid_extensions)
 
         # Check if index is valid
         if index >= len(dir_files):
@@ -147,9 +142,6 @@ class Soze_LoadVideosFromFolder:
 
         # Load only the single video at the specified index
         video_path = dir_files[index]
-        
-        if os.path.isdir(video_path):
-            raise ValueError(f"Path at index {index} is a directory, not a video file.")
 
         input_filepath = folder_paths.get_annotated_filepath(video_path)
         input_filename = os.path.basename(input_filepath)